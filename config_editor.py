@@ -1,10 +1,12 @@
-import json
+import copy
+import functools
+import itertools
+import random
 from pathlib import Path
-from typing import Dict, Any, List, Tuple, Optional, Union
+from typing import Dict, Any, Iterable, List, Tuple, Optional, Union
 import os, signal
-from dataclasses import asdict
 
-from PyQt6.QtCore import Qt, QPoint, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer, QSignalBlocker, QStringListModel
 from PyQt6.QtGui import QIntValidator, QAction, QIcon
 from PyQt6.QtWidgets import (
     QApplication,
@@ -30,15 +32,26 @@ from PyQt6.QtWidgets import (
     QWidget,
     QStyle,
     QSizePolicy,
-    QGraphicsOpacityEffect,
 )
 from dataclasses import dataclass, field
 
+from serialization import dumps, loads_jsonc
+
+APP_DIR = Path(__file__).resolve().parent
 CONFIG_PATH = Path(__file__).with_name("config.json")
-PRESET_DIR = (Path(__file__).resolve().parent / "presets")
+CONFIG_PATH_RESOLVED = CONFIG_PATH.resolve()
+PRESET_DIR = APP_DIR / "presets"
 PRESET_DIR.mkdir(exist_ok=True)
+DEFAULT_PRESET_PATH = PRESET_DIR / "Default.json"
+ICON_DIR = APP_DIR / "icons"
 LOCK_PATH = Path.home() / ".tr_router.lock"
 RELOAD_SIGNAL = signal.SIGUSR1 if hasattr(signal, "SIGUSR1") else signal.SIGHUP
+# Pattern on/off changes travel as a small {name: enabled} file + its own signal
+ENABLE_PATH = CONFIG_PATH.with_name("config.enable.json")
+ENABLE_SIGNAL = getattr(signal, "SIGUSR2", None)
+NOTIFY_DEBOUNCE_MS = 150
+# Drag edits repaint at most once per frame (~60 Hz)
+DRAG_FLUSH_MS = 16
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -52,51 +65,171 @@ DIVISION_OPTIONS = [
 ]
 
 STEP_OPTIONS = ["X", "R"] + [str(i) for i in range(1, 9)]
+SOCT_OPTIONS = [str(i) for i in range(-2, 3)]
+SOCT_VALUES = tuple(range(-2, 3))  # int value per SOCT_OPTIONS index
+OCT_OPTIONS = ["0", "+1", "+2", "-1", "-2", "+-1", "+-2"]
+LENGTH_OPTIONS = [str(i) for i in range(1, 17)]
+CHANNEL_OPTIONS = LENGTH_OPTIONS  # both 1..16
+
+# text -> combo index for each option list (avoids QComboBox.findText scans)
+DIVISION_IDX = {v: i for i, v in enumerate(DIVISION_OPTIONS)}
+STEP_IDX = {v: i for i, v in enumerate(STEP_OPTIONS)}
+SOCT_IDX = {v: i for i, v in enumerate(SOCT_OPTIONS)}
+OCT_IDX = {v: i for i, v in enumerate(OCT_OPTIONS)}
+LENGTH_IDX = {v: i for i, v in enumerate(LENGTH_OPTIONS)}
+CHANNEL_IDX = LENGTH_IDX
+
+# One read-only item model per option list, shared by every combo showing it.
+# Created on first use because Qt models need a QApplication.
+_COMBO_MODELS: Dict[Tuple[str, ...], QStringListModel] = {}
+
+
+def _shared_model(options: List[str]) -> QStringListModel:
+    key = tuple(options)
+    model = _COMBO_MODELS.get(key)
+    if model is None:
+        model = _COMBO_MODELS[key] = QStringListModel(list(key))
+    return model
+
+# Grid is always built MAX_STEPS wide; pattern length only hides columns.
+MAX_STEPS = 16
+GRID_ROWS = (
+    ("steps", "Step"),
+    ("velocity", "Velocity"),
+    ("v-random", "V-Random"),
+    ("s-prob", "S-Prob"),
+    ("s-oct", "S-Oct"),
+    ("r-oct", "R-Oct"),
+    ("gate", "Gate"),
+)
+
+# Prebuilt text for every MIDI data value, reused on the drag hot path
+_INT_STR = tuple(str(i) for i in range(128))
+
+def _write_atomic(path: Path, payload: bytes) -> None:
+    """Write via a sibling temp file and rename, so readers (the router)
+    never see a half-written file."""
+    tmp = str(path) + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    os.replace(tmp, path)
+
+
+@functools.lru_cache(maxsize=None)
+def _icon(name: str) -> QIcon:
+    """Icon from ``icons/``, decoded once and shared by every button using it."""
+    return QIcon(str(ICON_DIR / name))
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_config(path_str: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Parse a JSON preset that may contain // comments.
+
+    Memoized on (path, mtime, size): reopening an unchanged file skips the
+    read and parse. Callers must deep-copy the result before mutating it.
+    """
+    raw = Path(path_str).read_bytes()
+    return loads_jsonc(raw)
 
 
 class DragSpinBox(QLineEdit):
     """Numeric input that supports click-drag to change value."""
 
+    __slots__ = (
+        "_min", "_max", "_validator", "_dragging", "_drag_start_y",
+        "_drag_start_val", "_last_val", "_last_steps", "_px_per_step",
+        "_pending", "_flush_timer",
+    )
+
+    # Validators are stateless, so one per (min, max) range is shared by all
+    # instances instead of each cell owning its own QObject.
+    _VALIDATOR_CACHE: Dict[Tuple[int, int], QIntValidator] = {}
+
     def __init__(self, minimum: int, maximum: int, parent=None):
         super().__init__(parent)
         self._min = minimum
         self._max = maximum
-        self._validator = QIntValidator(minimum, maximum, self)
-        self.setValidator(self._validator)
+        key = (minimum, maximum)
+        validator = DragSpinBox._VALIDATOR_CACHE.get(key)
+        if validator is None:
+            validator = DragSpinBox._VALIDATOR_CACHE[key] = QIntValidator(minimum, maximum)
+        self._validator = validator
+        self.setValidator(validator)
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self._dragging = False
-        self._drag_start_pos: Optional[QPoint] = None
+        self._drag_start_y: int = 0
         self._drag_start_val: int = 0
+        self._last_val: int = 0
+        self._last_steps: int = 0
         # single-step increment per 10 px vertical movement
         self._px_per_step = 10
+        # drag value waiting for the next frame; timer created on first drag
+        self._pending = False
+        self._flush_timer: Optional[QTimer] = None
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self._dragging = True
-            self._drag_start_pos = event.globalPosition().toPoint()
+            self._drag_start_y = int(event.globalPosition().y())
             try:
                 self._drag_start_val = int(self.text())
             except ValueError:
                 self._drag_start_val = self._min
+            self._last_val = self._drag_start_val
+            self._last_steps = 0
             event.accept()
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
-        if self._dragging and self._drag_start_pos is not None:
-            dy = self._drag_start_pos.y() - event.globalPosition().toPoint().y()
+        if self._dragging:
+            dy = self._drag_start_y - int(event.globalPosition().y())
             steps = dy // self._px_per_step
-            new_val = max(self._min, min(self._max, self._drag_start_val + steps))
-            self.setText(str(new_val))
+            if steps != self._last_steps:
+                self._last_steps = steps
+                new_val = min(self._max, max(self._min, self._drag_start_val + steps))
+                if new_val != self._last_val:
+                    self._last_val = new_val
+                    self._schedule_flush()
+            # Handled – QLineEdit would only extend a text selection here
             event.accept()
+            return
         super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton and self._dragging:
             self._dragging = False
-            self._drag_start_pos = None
+            self._flush()
+            if self._last_val != self._drag_start_val:
+                self.textEdited.emit(self.text())
             event.accept()
         super().mouseReleaseEvent(event)
 
+    def _schedule_flush(self) -> None:
+        self._pending = True
+        timer = self._flush_timer
+        if timer is None:
+            timer = self._flush_timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(DRAG_FLUSH_MS)
+            timer.timeout.connect(self._flush)  # type: ignore[arg-type]
+        if not timer.isActive():
+            timer.start()
+
+    def _flush(self) -> None:
+        """Show the latest dragged value; signals stay quiet while dragging,
+        textEdited is emitted once on release."""
+        if not self._pending:
+            return
+        self._pending = False
+        self.blockSignals(True)
+        self.setValue(self._last_val)
+        self.blockSignals(False)
+
     def value(self) -> int:
         try:
             return int(self.text())
@@ -104,7 +237,10 @@ class DragSpinBox(QLineEdit):
             return self._min
 
     def setValue(self, v: int):
-        self.setText(str(max(self._min, min(self._max, v))))
+        v = max(self._min, min(self._max, v))
+        txt = _INT_STR[v] if 0 <= v < 128 else str(v)
+        if txt != self.text():  # skip validator/repaint when unchanged
+            self.setText(txt)
 
 
 # ---------------------------------------------------------------------------
@@ -115,74 +251,108 @@ class DragSpinBox(QLineEdit):
 class GateSpinBox(QLineEdit):
     """Input for Gate that supports 0-100 and special 'T', with drag behaviour."""
 
+    __slots__ = (
+        "_dragging", "_drag_start_y", "_drag_start_val", "_last_val",
+        "_last_steps", "_px_per_step", "_pending", "_flush_timer",
+    )
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self._dragging = False
-        self._drag_start_pos: Optional[QPoint] = None
+        self._drag_start_y: int = 0
         self._drag_start_val: int = 0  # 0-101 where 101 represents 'T'
+        self._last_val: int = 0
+        self._last_steps: int = 0
         self._px_per_step = 10
+        self._pending = False
+        self._flush_timer: Optional[QTimer] = None
 
     # ----------------------- helpers -----------------------
 
     def _text_to_val(self) -> int:
-        txt = self.text().strip().upper()
-        if txt == "T":
-            return 101
+        txt = self.text()
+        # int() tolerates surrounding whitespace, so plain numbers skip the
+        # strip()/upper() copies; only non-numeric text is normalised.
         try:
-            return max(0, min(100, int(txt)))
+            return min(100, max(0, int(txt)))
         except ValueError:
-            return 0
+            return 101 if txt.strip().upper() == "T" else 0
 
     def _val_to_text(self, val: int):
-        if val > 100:
-            self.setText("T")
-        else:
-            self.setText(str(max(0, min(100, val))))
+        txt = "T" if val > 100 else _INT_STR[max(0, min(100, val))]
+        if txt != self.text():
+            self.setText(txt)
 
     # -------------------- mouse events ---------------------
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self._dragging = True
-            self._drag_start_pos = event.globalPosition().toPoint()
+            self._drag_start_y = int(event.globalPosition().y())
             self._drag_start_val = self._text_to_val()
+            self._last_val = self._drag_start_val
+            self._last_steps = 0
             event.accept()
         super().mousePressEvent(event)
 
     def mouseMoveEvent(self, event):
-        if self._dragging and self._drag_start_pos is not None:
-            dy = self._drag_start_pos.y() - event.globalPosition().toPoint().y()
+        if self._dragging:
+            dy = self._drag_start_y - int(event.globalPosition().y())
             steps = dy // self._px_per_step
-            new_val = self._drag_start_val + steps
-            # normalise range: val <=100 numeric; >100 treated as T cap
-            if new_val > 100:
-                new_val = 101
-            elif new_val < 0:
-                new_val = 0
-            self._val_to_text(new_val)
+            if steps != self._last_steps:
+                self._last_steps = steps
+                # normalise range: val <=100 numeric; >100 treated as T cap
+                new_val = min(101, max(0, self._drag_start_val + steps))
+                if new_val != self._last_val:
+                    self._last_val = new_val
+                    self._schedule_flush()
+            # Handled – QLineEdit would only extend a text selection here
             event.accept()
+            return
         super().mouseMoveEvent(event)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton and self._dragging:
             self._dragging = False
-            self._drag_start_pos = None
+            self._flush()
+            if self._last_val != self._drag_start_val:
+                self.textEdited.emit(self.text())
             event.accept()
         super().mouseReleaseEvent(event)
 
+    def _schedule_flush(self) -> None:
+        self._pending = True
+        timer = self._flush_timer
+        if timer is None:
+            timer = self._flush_timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(DRAG_FLUSH_MS)
+            timer.timeout.connect(self._flush)  # type: ignore[arg-type]
+        if not timer.isActive():
+            timer.start()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        self._pending = False
+        self.blockSignals(True)
+        self._val_to_text(self._last_val)
+        self.blockSignals(False)
+
     # ---------------------- API ----------------------------
 
     def value_text(self) -> str:
         """Return 'T' or numeric string"""
-        t = self.text().strip().upper()
-        if t == "T":
-            return "T"
+        return str(self.export_value())
+
+    def export_value(self) -> Union[int, str]:
+        """Return 'T' or the clamped int, as stored in the config."""
+        t = self.text()
         try:
-            v = int(t)
-            return str(max(0, min(100, v)))
+            return min(100, max(0, int(t)))
         except ValueError:
-            return "100"
+            return "T" if t.strip().upper() == "T" else 100
 
     # Provide numeric value (T mapped to 101) for compatibility
     def value(self) -> int:
@@ -192,12 +362,65 @@ class GateSpinBox(QLineEdit):
         return int(vt)
 
 
+# ---------------------------------------------------------------------------
+# Step cell: click-to-cycle label instead of a full QComboBox
+# ---------------------------------------------------------------------------
+
+
+class StepCycleLabel(QLabel):
+    """Step selector cycling through STEP_OPTIONS: left click moves forward,
+    right click back. Mirrors the QComboBox index/text API used by the grid."""
+
+    __slots__ = ("_idx",)
+
+    def __init__(self, parent=None):
+        super().__init__(STEP_OPTIONS[0], parent)
+        self._idx = 0
+        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.setFrameShape(QLabel.Shape.StyledPanel)
+        self.setCursor(Qt.CursorShape.PointingHandCursor)
+
+    def mousePressEvent(self, event):
+        button = event.button()
+        if button == Qt.MouseButton.LeftButton:
+            self.setCurrentIndex((self._idx + 1) % len(STEP_OPTIONS))
+        elif button == Qt.MouseButton.RightButton:
+            self.setCurrentIndex((self._idx - 1) % len(STEP_OPTIONS))
+        else:
+            super().mousePressEvent(event)
+            return
+        event.accept()
+
+    def currentIndex(self) -> int:
+        return self._idx
+
+    def setCurrentIndex(self, idx: int) -> None:
+        self._idx = idx
+        self.setText(STEP_OPTIONS[idx])
+
+    def currentText(self) -> str:
+        return STEP_OPTIONS[self._idx]
+
+
+_PATTERN_STYLE = "QGroupBox { margin-top:20px; }"
+_PATTERN_STYLE_DISABLED = _PATTERN_STYLE + "\nQLabel, QLineEdit, QComboBox { color: rgba(128, 128, 128, 150); }"
+
+
 class PatternWidget(QGroupBox):
     """Widget representing a single pattern block."""
 
+    __slots__ = (
+        "_name", "_data", "_output_channel", "_enabled", "_shown_enabled", "enable_btn",
+        "top_layout", "length_combo", "octave_combo",
+        "division_combo", "channel_combo", "grid", "grid_container",
+        "_rows", "_header_labels", "_length", "_octave", "_channel",
+    )
+
+    # Fixed width of every grid cell; QLineEdit/QComboBox size hints are wider
+    _CELL_WIDTH = 70
+
     def __init__(self, name: str, cfg: Dict[str, Any], midi_channel: int, parent=None):
         super().__init__("", parent)  # title handled manually via label
-        self.setStyleSheet("QGroupBox { margin-top:20px; }")
         self._name = name
         self._data = cfg  # reference maintained
         self._output_channel = midi_channel
@@ -205,10 +428,10 @@ class PatternWidget(QGroupBox):
         # Enabled toggle (power icon)
         # ------------------------------------------------------------------
         self._enabled: bool = bool(cfg.get("enabled", True))
+        self._shown_enabled: Optional[bool] = None  # state last styled
 
-        power_icon_path = Path(__file__).resolve().parent / "icons" / "ic_power.svg"
         self.enable_btn = QToolButton()
-        self.enable_btn.setIcon(QIcon(str(power_icon_path)))
+        self.enable_btn.setIcon(_icon("ic_power.svg"))
         self.enable_btn.setCheckable(True)
         self.enable_btn.setChecked(self._enabled)
         # Subtle visual cue: dim icon when unchecked (disabled)
@@ -218,9 +441,7 @@ class PatternWidget(QGroupBox):
         )
         self.enable_btn.clicked.connect(self._on_enabled_toggled)  # type: ignore[arg-type]
 
-        # Apply opacity effect to whole widget
-        self._opacity_effect = QGraphicsOpacityEffect(self)
-        self.setGraphicsEffect(self._opacity_effect)
+        # Dim the whole widget when disabled
         self._update_opacity()  # type: ignore[attr-defined]
 
         self.top_layout = QHBoxLayout()
@@ -236,9 +457,9 @@ class PatternWidget(QGroupBox):
         # Center section
         self.top_layout.addStretch()
 
-        self.length_combo = self._make_combo([str(i) for i in range(1, 17)], str(cfg.get("length", 1)))
-        self.octave_combo = self._make_combo([str(i) for i in range(-2, 3)], str(cfg.get("oktawa", 0)))
-        self.division_combo = self._make_combo(DIVISION_OPTIONS, cfg.get("division", "1/16"))
+        self.length_combo = self._make_combo(LENGTH_OPTIONS, LENGTH_IDX, str(cfg.get("length", 1)))
+        self.octave_combo = self._make_combo(SOCT_OPTIONS, SOCT_IDX, str(cfg.get("oktawa", 0)))
+        self.division_combo = self._make_combo(DIVISION_OPTIONS, DIVISION_IDX, cfg.get("division", "1/16"))
 
         self.top_layout.addWidget(QLabel("Length"))
         self.top_layout.addWidget(self.length_combo)
@@ -250,10 +471,16 @@ class PatternWidget(QGroupBox):
         # Right section
         self.top_layout.addStretch()
 
-        self.channel_combo = self._make_combo([str(i) for i in range(1, 17)], str(midi_channel))
+        self.channel_combo = self._make_combo(CHANNEL_OPTIONS, CHANNEL_IDX, str(midi_channel))
         self.top_layout.addWidget(QLabel("MIDI ch"))
         self.top_layout.addWidget(self.channel_combo)
 
+        # Top-level values cached as ints, refreshed when a combo changes
+        self._length = self._octave = self._channel = 0
+        self._refresh_top_values()
+        for combo in (self.length_combo, self.octave_combo, self.channel_combo):
+            combo.currentIndexChanged.connect(self._refresh_top_values)  # type: ignore[arg-type]
+
         self.grid = QGridLayout()
         self.grid.setHorizontalSpacing(8)
         self.grid.setVerticalSpacing(4)
@@ -268,12 +495,20 @@ class PatternWidget(QGroupBox):
         main_layout.addWidget(self.grid_container)
         self.setLayout(main_layout)
 
-        self._build_grid()
-        self.length_combo.currentTextChanged.connect(self._build_grid)  # type: ignore[arg-type]
-
-        # adjust container width after adding widgets
-        if hasattr(self, "grid_container"):
-            self.grid_container.setMinimumWidth(self.grid_container.sizeHint().width())
+        # Per-row cell widgets (index == column), filled by _create_cells
+        # Cells are created lazily on first show (or first export/randomize)
+        self._rows: Dict[str, List[QWidget]] = {}
+        self._header_labels: List[QLabel] = []
+        # connected after _refresh_top_values, so _length is current here
+        self.length_combo.currentIndexChanged.connect(self._build_grid)  # type: ignore[arg-type]
+
+    def showEvent(self, event):
+        # Patterns scrolled out of view get their grid after the first paint
+        if self._rows or not self.visibleRegion().isEmpty():
+            self._ensure_grid()
+        else:
+            QTimer.singleShot(0, self._ensure_grid)
+        super().showEvent(event)
 
     # ------------------------------------------------------------------
     # Enabled helper & handler
@@ -281,8 +516,7 @@ class PatternWidget(QGroupBox):
 
     def _on_enabled_toggled(self, checked: bool):
         self._enabled = checked
-        # persist to backing data so export/save reflects change immediately
-        self._data["enabled"] = self._enabled
+        # export_data reads self._enabled, so the backing data is left alone
         self._update_opacity()  # type: ignore[attr-defined]
         # Keep interactions possible even when disabled
         self.setEnabled(True)
@@ -291,13 +525,19 @@ class PatternWidget(QGroupBox):
         return self._enabled
 
     def _update_opacity(self) -> None:
-        """Adjust QGraphicsOpacityEffect according to enabled flag."""
-        if hasattr(self, "_opacity_effect"):
-            self._opacity_effect.setOpacity(1.0 if self._enabled else 0.5)
+        """Dim text via the stylesheet according to enabled flag.
+
+        A stylesheet colour is used instead of QGraphicsOpacityEffect, which
+        would render the whole pattern offscreen on every paint.
+        """
+        enabled = self._enabled
+        if enabled == self._shown_enabled:
+            return
+        self._shown_enabled = enabled
+        self.setStyleSheet(_PATTERN_STYLE if enabled else _PATTERN_STYLE_DISABLED)
         # also update button checked state to stay in sync (in case called externally)
         if hasattr(self, "enable_btn"):
-            self.enable_btn.setChecked(self._enabled)
-        self.update()
+            self.enable_btn.setChecked(enabled)
 
     # ------------------------------------------------------------------
     # External setter for enabled flag (used by master toggle)
@@ -306,241 +546,160 @@ class PatternWidget(QGroupBox):
     def set_enabled(self, flag: bool) -> None:
         """Programmatically enable/disable pattern without altering controls."""
         self._enabled = bool(flag)
-        # update underlying data so export_data reflects new state
-        self._data["enabled"] = self._enabled
         self._update_opacity()
 
-    def _make_combo(self, options: List[str], current: str) -> QComboBox:
+    def reload(self, cfg: Dict[str, Any], midi_channel: int) -> None:
+        """Show a new config in this widget, reusing its existing cells."""
+        self._data = cfg
+        self._output_channel = midi_channel
+        self._enabled = bool(cfg.get("enabled", True))
+        self._update_opacity()
+        with QSignalBlocker(self.length_combo), QSignalBlocker(self.octave_combo), \
+                QSignalBlocker(self.division_combo), QSignalBlocker(self.channel_combo):
+            self.length_combo.setCurrentIndex(LENGTH_IDX.get(str(cfg.get("length", 1)), 0))
+            self.octave_combo.setCurrentIndex(SOCT_IDX.get(str(cfg.get("oktawa", 0)), 0))
+            self.division_combo.setCurrentIndex(DIVISION_IDX.get(cfg.get("division", "1/16"), 0))
+            self.channel_combo.setCurrentIndex(CHANNEL_IDX.get(str(midi_channel), 0))
+        self._refresh_top_values()
+        if self._rows:  # unbuilt grids read the new data on first show
+            self.grid_container.setUpdatesEnabled(False)
+            try:
+                self._fill_cells()
+            finally:
+                self.grid_container.setUpdatesEnabled(True)
+            self._build_grid()
+
+    def _make_combo(self, options: List[str], index: Dict[str, int], current: str) -> QComboBox:
         box = QComboBox()
-        for opt in options:
-            box.addItem(opt)
-        idx = box.findText(current)
-        if idx >= 0:
-            box.setCurrentIndex(idx)
+        box.setModel(_shared_model(options))
+        # unknown values fall back to the first option
+        box.setCurrentIndex(index.get(current, 0))
         box.setEditable(False)
         return box
 
-    def _capture_grid_state(self):
-        """Read values from existing grid widgets and store them into self._data before grid is rebuilt.
-        This preserves user edits when the pattern length changes."""
-        if self.grid.count() == 0:
-            # Grid hasn't been built yet
-            return
-
-        prev_length = len(self._data.get("steps", []))
-        if prev_length == 0:
-            return
-
-        # Helper to safely fetch widget at given position
-        def _widget(row: int, col: int):
-            item = self.grid.itemAtPosition(row, col)
-            return item.widget() if item else None
-
-        # Steps row (row 1)
-        new_steps = []
-        for col in range(prev_length):
-            box = _widget(1, col + 1)
-            if isinstance(box, QComboBox):
-                txt = box.currentText().strip()
-                txt_up = txt.upper()
-                if txt_up in ("R", "X"):
-                    new_steps.append(txt_up)
-                else:
-                    try:
-                        new_steps.append(int(txt))
-                    except ValueError:
-                        new_steps.append(txt)
-        if new_steps:
-            self._data["steps"] = new_steps
-
-        # Velocity row (row 2)
-        new_velocity = []
-        for col in range(prev_length):
-            spin = _widget(2, col + 1)
-            if isinstance(spin, DragSpinBox):
-                new_velocity.append(spin.value())
-        if new_velocity:
-            self._data["velocity"] = new_velocity
-
-        # v-random row (row 3)
-        new_vrand = []
-        for col in range(prev_length):
-            spin = _widget(3, col + 1)
-            if isinstance(spin, DragSpinBox):
-                new_vrand.append(spin.value())
-        if new_vrand:
-            self._data["v-random"] = new_vrand
-
-        # s-prob row (row 4)
-        new_sprob = []
-        for col in range(prev_length):
-            spin = _widget(4, col + 1)
-            if isinstance(spin, DragSpinBox):
-                new_sprob.append(spin.value())
-        if new_sprob:
-            self._data["s-prob"] = new_sprob
-
-        # s-oct row (row 5)
-        new_soct = []
-        for col in range(prev_length):
-            box = _widget(5, col + 1)
-            if isinstance(box, QComboBox):
-                try:
-                    new_soct.append(int(box.currentText()))
-                except ValueError:
-                    new_soct.append(0)
-        if new_soct:
-            self._data["s-oct"] = new_soct
-
-        # r-oct row (row 6)
-        new_roct = []
-        for col in range(prev_length):
-            box = _widget(6, col + 1)
-            if isinstance(box, QComboBox):
-                new_roct.append(box.currentText())
-        if new_roct:
-            self._data["r-oct"] = new_roct
-
-        # Gate row (row 7)
-        new_gate = []
-        for col in range(prev_length):
-            spin = _widget(7, col + 1)
-            if isinstance(spin, GateSpinBox):
-                txt = spin.value_text()
-                if txt == "T":
-                    new_gate.append("T")
-                else:
-                    try:
-                        new_gate.append(int(txt))
-                    except ValueError:
-                        new_gate.append(100)
-        if new_gate:
-            self._data["gate"] = new_gate
-
     # --------------------------------- grid ---------------------------------
 
-    def _build_grid(self, _changed: Optional[str] = None) -> None:
-        # Capture current values before rebuilding so user edits are preserved
-        self._capture_grid_state()
-
-        # clear existing widgets
-        while self.grid.count():
-            item = self.grid.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-        length = int(self.length_combo.currentText())
-        # Ensure arrays have correct length
-        for key, default_val in (
-            ("steps", "R"),
-            ("velocity", 100),
-            ("v-random", 0),
-            ("s-prob", 100),
-            ("s-oct", 0),
-            ("r-oct", "0"),
-            ("gate", 100),
-        ):
-            arr = self._data.get(key, [])
-            if len(arr) < length:
-                arr += [default_val] * (length - len(arr))
-            self._data[key] = arr[:length]
-        # Labels row
-        headers = [str(i + 1) for i in range(length)]
-        for col, lbl in enumerate(headers):
-            self.grid.addWidget(QLabel(lbl), 0, col + 1, alignment=Qt.AlignmentFlag.AlignCenter)
-        # Steps row
-        self.grid.addWidget(QLabel("Step"), 1, 0)
-        for col in range(length):
-            box = QComboBox()
-            box.setFixedWidth(70)
-            for opt in STEP_OPTIONS:
-                box.addItem(opt)
-            current = str(self._data["steps"][col])
-            idx = box.findText(current)
-            if idx >= 0:
-                box.setCurrentIndex(idx)
-            self.grid.addWidget(box, 1, col + 1)
-        # Velocity row
-        self.grid.addWidget(QLabel("Velocity"), 2, 0)
-        for col in range(length):
-            spin = DragSpinBox(1, 127)
-            spin.setFixedWidth(70)
-            spin.setValue(int(self._data["velocity"][col]))
-            self.grid.addWidget(spin, 2, col + 1)
-        # v-random row
-        self.grid.addWidget(QLabel("V-Random"), 3, 0)
-        for col in range(length):
-            spin = DragSpinBox(0, 100)
-            spin.setFixedWidth(70)
-            spin.setValue(int(self._data["v-random"][col]))
-            self.grid.addWidget(spin, 3, col + 1)
-        # s-prob row
-        self.grid.addWidget(QLabel("S-Prob"), 4, 0)
-        for col in range(length):
-            spin = DragSpinBox(0, 100)
-            spin.setFixedWidth(70)
-            spin.setValue(int(self._data["s-prob"][col]))
-            self.grid.addWidget(spin, 4, col + 1)
-        # s-oct row
-        self.grid.addWidget(QLabel("S-Oct"), 5, 0)
-        for col in range(length):
-            box = QComboBox()
-            box.setFixedWidth(70)
-            box.addItems([str(i) for i in range(-2,3)])
-            cur = str(self._data.get("s-oct", [0]*length)[col])
-            idx = box.findText(cur)
-            if idx>=0:
-                box.setCurrentIndex(idx)
-            self.grid.addWidget(box,5,col+1)
-        # r-oct row
-        self.grid.addWidget(QLabel("R-Oct"), 6, 0)
-        OCT_OPTIONS = ["0","+1","+2","-1","-2","+-1","+-2"]
-        for col in range(length):
-            box = QComboBox()
-            box.setFixedWidth(70)
-            box.addItems(OCT_OPTIONS)
-            cur = str(self._data.get("r-oct", ["0"]*length)[col])
-            idx = box.findText(cur)
-            if idx>=0:
-                box.setCurrentIndex(idx)
-            self.grid.addWidget(box,6,col+1)
-        # Gate row
-        self.grid.addWidget(QLabel("Gate"), 7, 0)
-        for col in range(length):
-            spin = GateSpinBox()
-            spin.setFixedWidth(70)
-            val = self._data["gate"][col]
-            if isinstance(val, str) and val.upper() == "T":
-                spin.setText("T")
-            else:
-                spin.setText(str(int(val)))
-            self.grid.addWidget(spin, 7, col + 1)
+    def _create_cells(self) -> None:
+        """Create the full MAX_STEPS-wide grid once; later length changes only
+        toggle column visibility so widgets (and user edits) are reused."""
+        for col in range(MAX_STEPS):
+            lbl = QLabel(str(col + 1))
+            self._header_labels.append(lbl)
+            self.grid.addWidget(lbl, 0, col + 1, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        for row, (key, title) in enumerate(GRID_ROWS, start=1):
+            self.grid.addWidget(QLabel(title), row, 0)
+            cells: List[QWidget] = []
+            for col in range(MAX_STEPS):
+                if key == "steps":
+                    w: QWidget = StepCycleLabel()
+                elif key == "velocity":
+                    w = DragSpinBox(1, 127)
+                elif key in ("v-random", "s-prob"):
+                    w = DragSpinBox(0, 100)
+                elif key == "s-oct":
+                    box = QComboBox()
+                    box.setModel(_shared_model(SOCT_OPTIONS))
+                    w = box
+                elif key == "r-oct":
+                    box = QComboBox()
+                    box.setModel(_shared_model(OCT_OPTIONS))
+                    w = box
+                else:  # gate
+                    w = GateSpinBox()
+                # sized before it joins the layout, so no relayout is triggered
+                w.setFixedWidth(self._CELL_WIDTH)
+                self.grid.addWidget(w, row, col + 1)
+                cells.append(w)
+            self._rows[key] = cells
 
         # Dodaj elastyczną pustą kolumnę, aby wiersze kroków zawsze były
         # wyrównane do lewej, a wolne miejsce „rozpychało się” na prawo.
-        self.grid.setColumnStretch(length + 1, 1)
+        self.grid.setColumnStretch(MAX_STEPS + 1, 1)
+        self._fill_cells()
+
+    def _fill_cells(self) -> None:
+        """Load every cell's value from the backing data."""
+        data = self._data
+        rows = self._rows
+
+        def _val(key: str, col: int, default):
+            arr = data.get(key, [])
+            return arr[col] if col < len(arr) else default
+
+        for col in range(MAX_STEPS):
+            rows["steps"][col].setCurrentIndex(STEP_IDX.get(str(_val("steps", col, "R")), 0))  # type: ignore[attr-defined]
+            rows["velocity"][col].setValue(int(_val("velocity", col, 100)))  # type: ignore[attr-defined]
+            rows["v-random"][col].setValue(int(_val("v-random", col, 0)))  # type: ignore[attr-defined]
+            rows["s-prob"][col].setValue(int(_val("s-prob", col, 100)))  # type: ignore[attr-defined]
+            rows["s-oct"][col].setCurrentIndex(SOCT_IDX.get(str(_val("s-oct", col, 0)), 0))  # type: ignore[attr-defined]
+            rows["r-oct"][col].setCurrentIndex(OCT_IDX.get(str(_val("r-oct", col, "0")), 0))  # type: ignore[attr-defined]
+            val = _val("gate", col, 100)
+            if isinstance(val, str) and val.upper() == "T":
+                rows["gate"][col].setText("T")  # type: ignore[attr-defined]
+            else:
+                num = int(val)
+                rows["gate"][col].setText(_INT_STR[num] if 0 <= num < 128 else str(num))  # type: ignore[attr-defined]
+
+    def _ensure_grid(self) -> None:
+        """Create the grid cells if they have not been built yet."""
+        if self._rows:
+            return
+        self.grid_container.setUpdatesEnabled(False)
+        try:
+            self._create_cells()
+        finally:
+            self.grid_container.setUpdatesEnabled(True)
+        self._build_grid()
+        # adjust container width after adding widgets
+        self.grid_container.setMinimumWidth(self.grid_container.sizeHint().width())
+
+    def _refresh_top_values(self, _index: int = 0) -> None:
+        self._length = self.length_combo.currentIndex() + 1
+        self._octave = SOCT_VALUES[self.octave_combo.currentIndex()]
+        self._channel = self.channel_combo.currentIndex() + 1
+
+    def _build_grid(self, _index: int = 0) -> None:
+        if not self._rows:
+            return  # not built yet – _ensure_grid applies the length
+        length = self._length
+        # Hold repaints until every column is toggled – one pass at the end
+        container = self.grid_container
+        container.setUpdatesEnabled(False)
+        try:
+            for col in range(MAX_STEPS):
+                visible = col < length
+                self._header_labels[col].setVisible(visible)
+                for cells in self._rows.values():
+                    cells[col].setVisible(visible)
+        finally:
+            container.setUpdatesEnabled(True)
 
     # --------------------------------- export --------------------------------
 
     def export_data(self) -> Tuple[int, Dict[str, Any]]:
-        length = int(self.length_combo.currentText())
-        octave = int(self.octave_combo.currentText())
+        length = self._length
+        octave = self._octave
         division = self.division_combo.currentText()
-        midi_ch = int(self.channel_combo.currentText())
+        midi_ch = self._channel
+
+        rows = self._rows_from_cells(length) if self._rows else self._rows_from_data(length)
+        data = {"length": length}
+        data.update(rows)
+        data.update({
+            "oktawa": octave,
+            "division": division,
+            "enabled": self._enabled,
+        })
+        return midi_ch, data
 
+    def _rows_from_cells(self, length: int) -> Dict[str, Any]:
         steps: List[Union[str, int]] = []
-        velocity: List[int] = []
-        vrand: List[int] = []
-        sprob: List[int] = []
-        soct: List[int] = []
-        roct: List[str] = []
-        gate: List[Union[int, str]] = []
 
-        # Extract from grid widgets row by row
-        # Steps row (row 1)
-        for col in range(length):
-            box: QComboBox = self.grid.itemAtPosition(1, col + 1).widget()  # type: ignore
-            txt = box.currentText()
+        # Extract from cached cell widgets row by row
+        rows = self._rows
+        for box in rows["steps"][:length]:
+            txt = box.currentText()  # type: ignore[attr-defined]
             if txt.upper() in ("R", "X"):
                 steps.append(txt.upper())
             else:
@@ -548,40 +707,14 @@ class PatternWidget(QGroupBox):
                     steps.append(int(txt))
                 except ValueError:
                     steps.append(txt)
-        # Velocity row (row 2)
-        for col in range(length):
-            spin: DragSpinBox = self.grid.itemAtPosition(2, col + 1).widget()  # type: ignore
-            velocity.append(spin.value())
-        # v-random row (row 3)
-        for col in range(length):
-            spin: DragSpinBox = self.grid.itemAtPosition(3, col + 1).widget()  # type: ignore
-            vrand.append(spin.value())
-        # s-prob row (row 4)
-        for col in range(length):
-            spin: DragSpinBox = self.grid.itemAtPosition(4, col + 1).widget()  # type: ignore
-            sprob.append(spin.value())
-        # s-oct row (row 5)
-        for col in range(length):
-            box: QComboBox = self.grid.itemAtPosition(5, col + 1).widget()  # type: ignore
-            soct.append(int(box.currentText()))
-        # r-oct row (row 6)
-        for col in range(length):
-            box: QComboBox = self.grid.itemAtPosition(6, col + 1).widget()  # type: ignore
-            roct.append(box.currentText())
-        # Gate row (row 6)
-        for col in range(length):
-            spin: GateSpinBox = self.grid.itemAtPosition(7, col + 1).widget()  # type: ignore
-            text = spin.value_text()
-            if text == "T":
-                gate.append("T")
-            else:
-                try:
-                    gate.append(int(text))
-                except ValueError:
-                    gate.append(100)
+        velocity = [spin.value() for spin in rows["velocity"][:length]]  # type: ignore[attr-defined]
+        vrand = [spin.value() for spin in rows["v-random"][:length]]  # type: ignore[attr-defined]
+        sprob = [spin.value() for spin in rows["s-prob"][:length]]  # type: ignore[attr-defined]
+        soct = [SOCT_VALUES[box.currentIndex()] for box in rows["s-oct"][:length]]  # type: ignore[attr-defined]
+        roct = [box.currentText() for box in rows["r-oct"][:length]]  # type: ignore[attr-defined]
+        gate = [spin.export_value() for spin in rows["gate"][:length]]  # type: ignore[attr-defined]
 
-        data = {
-            "length": length,
+        return {
             "steps": steps,
             "velocity": velocity,
             "v-random": vrand,
@@ -589,108 +722,177 @@ class PatternWidget(QGroupBox):
             "s-oct": soct,
             "r-oct": roct,
             "gate": gate,
-            "oktawa": octave,
-            "division": division,
-            "enabled": self._enabled,
         }
-        return midi_ch, data
+
+    def _rows_from_data(self, length: int) -> Dict[str, Any]:
+        """Same values as _rows_from_cells, read from the backing data while
+        the grid has not been built yet (e.g. the save on startup)."""
+        data = self._data
+
+        def _col(key: str, default) -> List[Any]:
+            arr = data.get(key, [])
+            return [arr[col] if col < len(arr) else default for col in range(length)]
+
+        def _opt(options: List[str], index: Dict[str, int], val) -> str:
+            # unknown values leave the combo on its first item
+            txt = str(val)
+            return txt if txt in index else options[0]
+
+        steps: List[Union[str, int]] = []
+        for val in _col("steps", "R"):
+            txt = _opt(STEP_OPTIONS, STEP_IDX, val)
+            steps.append(txt if txt in ("R", "X") else int(txt))
+        gate: List[Union[int, str]] = []
+        for val in _col("gate", 100):
+            if isinstance(val, str) and val.upper() == "T":
+                gate.append("T")
+            else:
+                gate.append(max(0, min(100, int(val))))
+
+        return {
+            "steps": steps,
+            "velocity": [max(1, min(127, int(v))) for v in _col("velocity", 100)],
+            "v-random": [max(0, min(100, int(v))) for v in _col("v-random", 0)],
+            "s-prob": [max(0, min(100, int(v))) for v in _col("s-prob", 100)],
+            "s-oct": [int(_opt(SOCT_OPTIONS, SOCT_IDX, v)) for v in _col("s-oct", 0)],
+            "r-oct": [_opt(OCT_OPTIONS, OCT_IDX, v) for v in _col("r-oct", "0")],
+            "gate": gate,
+        }
 
     def randomize(self, settings: "RandomSettings"):
-        import random
-        # Randomize top-level params (except MIDI channel)
-        if random.randint(1, 100) <= settings.length:
-            self.length_combo.setCurrentText(str(random.randint(1, 16)))
-        if random.randint(1, 100) <= settings.octave:
-            self.octave_combo.setCurrentText(str(random.randint(-2, 2)))
-        if random.randint(1, 100) <= settings.division:
-            allowed_divs = [d for d in DIVISION_OPTIONS if (
-                (settings.allow_div_d or not d.endswith("d")) and
-                (settings.allow_div_t or not d.endswith("t")) and
-                (settings.allow_div_q or not d.endswith("q"))
-            )]
-            self.division_combo.setCurrentText(random.choice(allowed_divs))
-        length = int(self.length_combo.currentText())
+        self._ensure_grid()
+        roct_current = [box.currentText() for box in self._rows["r-oct"]]  # type: ignore[attr-defined]
+        plan = plan_random(settings, self._length, roct_current)
+        self._apply_plan(plan)
+
+    def _apply_plan(self, plan: Dict[str, Any]) -> None:
+        """Write a plan produced by plan_random into the widgets."""
+        # Block combo signals so the length change does not rebuild the grid
+        # on its own – it is rebuilt exactly once below.
+        with QSignalBlocker(self.length_combo), QSignalBlocker(self.octave_combo), \
+                QSignalBlocker(self.division_combo):
+            if plan["length"] is not None:
+                self.length_combo.setCurrentIndex(plan["length"] - 1)  # options are 1..16
+            if plan["octave"] is not None:
+                self.octave_combo.setCurrentIndex(plan["octave"] + 2)  # options are -2..2
+            if plan["division"] is not None:
+                self.division_combo.setCurrentIndex(DIVISION_IDX[plan["division"]])
+        self._refresh_top_values()
         # Rebuild grid ensures correct length
         self._build_grid()
-        # Steps row
-        for col in range(length):
-            box: QComboBox = self.grid.itemAtPosition(1, col + 1).widget()  # type: ignore
-            if random.randint(1, 100) <= settings.steps:
-                box.setCurrentIndex(random.randrange(box.count()))
-        # Velocity row
-        for col in range(length):
-            spin: DragSpinBox = self.grid.itemAtPosition(2, col + 1).widget()  # type: ignore[assignment]
-            if random.randint(1, 100) <= settings.velocity:
-                spin.setValue(random.randint(1, 127))  # type: ignore[attr-defined]
-        # v-random row
-        for col in range(length):
-            spin: DragSpinBox = self.grid.itemAtPosition(3, col + 1).widget()  # type: ignore[assignment]
-            if random.randint(1, 100) <= settings.vrandom:
-                spin.setValue(random.randint(0, 100))  # type: ignore[attr-defined]
-        # s-prob row
-        for col in range(length):
-            spin: DragSpinBox = self.grid.itemAtPosition(4, col + 1).widget()  # type: ignore[assignment]
-            if random.randint(1, 100) <= settings.sprob:
-                spin.setValue(random.randint(0, 100))  # type: ignore[attr-defined]
-        # s-oct row
-        for col in range(length):
-            box: QComboBox = self.grid.itemAtPosition(5, col + 1).widget()  # type: ignore[assignment]
-            if random.randint(1, 100) <= settings.sprob: # Assuming sprob controls s-oct randomization
-                box.setCurrentIndex(random.randrange(box.count()))
-        # r-oct row – custom logic
-        OCT_OPTIONS = ["0", "+1", "+2", "-1", "-2", "+-1", "+-2"]
-
-        def _small_variants(cur: str) -> List[str]:
-            """Return a list of allowed small-change variants for given current value."""
-            if cur == "0":
-                return ["0", "+1", "+-1"]
-            if cur == "+1":
-                return ["0", "+1", "+2"]
-            if cur == "-1":
-                return ["0", "-1", "-2"]
-            if cur == "+2":
-                return ["+1", "+2"]
-            if cur == "-2":
-                return ["-1", "-2"]
-            if cur == "+-1":
-                return ["0", "+-1", "+1", "-1"]
-            if cur == "+-2":
-                return ["+-2", "+2", "-2", "+1", "-1"]
-            # fallback – all options
-            return OCT_OPTIONS
-
-        for col in range(length):
-            box: QComboBox = self.grid.itemAtPosition(6, col + 1).widget()  # type: ignore[assignment]
-            roct_setting = settings.roct
-            if roct_setting == 0:
-                continue  # no changes
-
-            # Determine probability (1-50%)
-            if roct_setting <= 50:
-                prob = roct_setting
+        rows = self._rows
+        for col, idx in plan["steps"]:
+            rows["steps"][col].setCurrentIndex(idx)  # type: ignore[attr-defined]
+        for key in ("velocity", "v-random", "s-prob"):
+            for col, val in plan[key]:
+                rows[key][col].setValue(val)  # type: ignore[attr-defined]
+        for col, idx in plan["s-oct"]:
+            rows["s-oct"][col].setCurrentIndex(idx)  # type: ignore[attr-defined]
+        for col, txt in plan["r-oct"]:
+            rows["r-oct"][col].setCurrentIndex(OCT_IDX[txt])  # type: ignore[attr-defined]
+        for col, val in plan["gate"]:
+            if val == "T":
+                rows["gate"][col].setText("T")  # type: ignore[attr-defined]
             else:
-                prob = roct_setting - 50
+                rows["gate"][col]._val_to_text(val)  # type: ignore[attr-defined]
 
-            if random.randint(1, 100) > prob:
-                continue  # skip change
 
-            current_txt = box.currentText()
+# ---------------------------------------------------------------------------
+# Randomization planning (pure – no Qt calls)
+# ---------------------------------------------------------------------------
 
-            if roct_setting <= 50:
-                # Small variant change
-                choices = _small_variants(current_txt)
-                box.setCurrentText(random.choice(choices))
-            else:
-                # Large variant change – pick any option
-                box.setCurrentText(random.choice(OCT_OPTIONS))
-        # Gate row
-        for col in range(length):
-            spin: GateSpinBox = self.grid.itemAtPosition(7, col + 1).widget()  # type: ignore
-            if random.randint(1, 100) <= settings.gate:
-                if settings.allow_gate_T and random.random() < 0.2:
-                    spin.setText("T")
-                else:
-                    spin._val_to_text(random.randint(0, 100))
+_PERCENT = range(1, 101)
+
+
+# Allowed small-change variants of each R-Oct value; unknown values may
+# change to any option (OCT_OPTIONS)
+_SMALL_VARIANTS: Dict[str, Tuple[str, ...]] = {
+    "0": ("0", "+1", "+-1"),
+    "+1": ("0", "+1", "+2"),
+    "-1": ("0", "-1", "-2"),
+    "+2": ("+1", "+2"),
+    "-2": ("-1", "-2"),
+    "+-1": ("0", "+-1", "+1", "-1"),
+    "+-2": ("+-2", "+2", "-2", "+1", "-1"),
+}
+
+
+def _allowed_divisions(allow_d: bool, allow_t: bool, allow_q: bool) -> Tuple[str, ...]:
+    return tuple(d for d in DIVISION_OPTIONS if (
+        (allow_d or not d.endswith("d")) and
+        (allow_t or not d.endswith("t")) and
+        (allow_q or not d.endswith("q"))
+    ))
+
+
+# All 8 combinations of the dotted/triplet/quintuplet flags, keyed by
+# (allow_div_d, allow_div_t, allow_div_q)
+ALLOWED_DIVS = {
+    flags: _allowed_divisions(*flags)
+    for flags in itertools.product((False, True), repeat=3)
+}
+
+# Shared generator for Global Random
+_rng = random.Random()
+
+
+def plan_random(settings: "RandomSettings", length: int, roct_current: List[str]) -> Dict[str, Any]:
+    """Draw all new values for one pattern without touching any widget.
+
+    *length* is the current pattern length and *roct_current* the R-Oct text
+    of every grid column. Top-level entries are ``None`` when unchanged; row
+    entries are lists of ``(column, value)`` pairs to apply.
+    """
+    plan: Dict[str, Any] = {"length": None, "octave": None, "division": None}
+    allowed_divs = ALLOWED_DIVS[
+        (bool(settings.allow_div_d), bool(settings.allow_div_t), bool(settings.allow_div_q))
+    ]
+    rng = _rng
+    # Randomize top-level params (except MIDI channel)
+    len_roll, oct_roll, div_roll = rng.choices(_PERCENT, k=3)
+    if len_roll <= settings.length:
+        plan["length"] = length = rng.randint(1, 16)
+    if oct_roll <= settings.octave:
+        plan["octave"] = rng.randint(-2, 2)
+    if div_roll <= settings.division:
+        plan["division"] = rng.choice(allowed_divs)
+
+    def _hits(prob: int) -> List[int]:
+        """Columns picked for change, each with *prob* percent chance."""
+        return [col for col, roll in enumerate(rng.choices(_PERCENT, k=length)) if roll <= prob]
+
+    def _draw(prob: int, values: range) -> List[Tuple[int, int]]:
+        cols = _hits(prob)
+        return list(zip(cols, rng.choices(values, k=len(cols))))
+
+    plan["steps"] = _draw(settings.steps, range(len(STEP_OPTIONS)))
+    plan["velocity"] = _draw(settings.velocity, range(1, 128))
+    plan["v-random"] = _draw(settings.vrandom, range(0, 101))
+    plan["s-prob"] = _draw(settings.sprob, range(0, 101))
+    # Assuming sprob controls s-oct randomization
+    plan["s-oct"] = _draw(settings.sprob, range(len(SOCT_OPTIONS)))
+
+    # r-oct row – custom logic: up to 50 picks small variants of the current
+    # value with that probability, above 50 any option with (setting - 50) %
+    roct: List[Tuple[int, str]] = []
+    roct_setting = settings.roct
+    if roct_setting:
+        small = roct_setting <= 50
+        for col in _hits(roct_setting if small else roct_setting - 50):
+            choices = _SMALL_VARIANTS.get(roct_current[col], OCT_OPTIONS) if small else OCT_OPTIONS
+            roct.append((col, rng.choice(choices)))
+    plan["r-oct"] = roct
+
+    # gate row – 20 % of changed cells become "T" when allowed
+    cols = _hits(settings.gate)
+    t_limit = 20 if settings.allow_gate_T else 0
+    rolls = rng.choices(_PERCENT, k=len(cols))
+    vals = rng.choices(range(0, 101), k=len(cols))
+    plan["gate"] = [
+        (col, "T" if roll <= t_limit else val)
+        for col, roll, val in zip(cols, rolls, vals)
+    ]
+    return plan
 
 
 # ---------------------------------------------------------------------------
@@ -729,7 +931,7 @@ class RandomSettings:
 
 
 class RandomSettingsDialog(QDialog):
-    def __init__(self, settings: "RandomSettings", pattern_names: List[str], parent=None):
+    def __init__(self, settings: "RandomSettings", pattern_names: Iterable[str], parent=None):
         super().__init__(parent)
         self.setWindowTitle("Global Random Settings")
         self._settings = settings
@@ -756,11 +958,7 @@ class RandomSettingsDialog(QDialog):
             slider.setTickInterval(10)
             slider.setTickPosition(QSlider.TickPosition.TicksBelow)
             value_lbl = QLabel(str(slider.value()))
-
-            def make_upd(lbl: QLabel, name: str):
-                return lambda val: (lbl.setText(str(val)), setattr(settings, name, val))
-
-            slider.valueChanged.connect(make_upd(value_lbl, attr))  # type: ignore[arg-type]
+            slider.valueChanged.connect(functools.partial(self._on_slider, attr, value_lbl))  # type: ignore[arg-type]
             hl.addWidget(slider)
             hl.addWidget(value_lbl)
             layout.addLayout(hl)
@@ -771,11 +969,7 @@ class RandomSettingsDialog(QDialog):
         for pname in pattern_names:
             cb = QCheckBox(pname)
             cb.setChecked(settings.patterns_enabled.get(pname, True))
-
-            def make_toggle(name: str):
-                return lambda state: settings.patterns_enabled.__setitem__(name, state == Qt.CheckState.Checked)
-
-            cb.stateChanged.connect(make_toggle(pname))  # type: ignore[arg-type]
+            cb.toggled.connect(functools.partial(self._on_pattern_toggled, pname))  # type: ignore[arg-type]
             pat_layout.addWidget(cb)
         layout.addLayout(pat_layout)
 
@@ -784,13 +978,13 @@ class RandomSettingsDialog(QDialog):
         other_layout = QHBoxLayout()
         self.cb_gate_T = QCheckBox("Allow Gate T")
         self.cb_gate_T.setChecked(settings.allow_gate_T)
-        self.cb_gate_T.stateChanged.connect(lambda s: setattr(settings, "allow_gate_T", s == Qt.CheckState.Checked))  # type: ignore[arg-type]
+        self.cb_gate_T.toggled.connect(functools.partial(self._on_option_toggled, "allow_gate_T"))  # type: ignore[arg-type]
         other_layout.addWidget(self.cb_gate_T)
 
         for lbl, attr in [("Allow d", "allow_div_d"), ("Allow t", "allow_div_t"), ("Allow q", "allow_div_q")]:
             cb = QCheckBox(lbl)
             cb.setChecked(getattr(settings, attr))
-            cb.stateChanged.connect(lambda s, a=attr: setattr(settings, a, s == Qt.CheckState.Checked))  # type: ignore[arg-type]
+            cb.toggled.connect(functools.partial(self._on_option_toggled, attr))  # type: ignore[arg-type]
             other_layout.addWidget(cb)
 
         layout.addLayout(other_layout)
@@ -803,6 +997,19 @@ class RandomSettingsDialog(QDialog):
 
         self.setLayout(layout)
 
+    # toggled(bool) is used rather than stateChanged(int): PyQt6 delivers the
+    # state as a plain int, which never compares equal to Qt.CheckState.Checked
+
+    def _on_slider(self, attr: str, lbl: QLabel, val: int) -> None:
+        lbl.setNum(val)
+        setattr(self._settings, attr, val)
+
+    def _on_pattern_toggled(self, name: str, checked: bool) -> None:
+        self._settings.patterns_enabled[name] = checked
+
+    def _on_option_toggled(self, attr: str, checked: bool) -> None:
+        setattr(self._settings, attr, checked)
+
 
 class ConfigEditor(QMainWindow):
     def __init__(self):
@@ -817,10 +1024,17 @@ class ConfigEditor(QMainWindow):
         self._arp_enabled: bool = True
         self._prev_pattern_enabled: Dict[str, bool] = {}
 
+        # Router notifications are debounced so a burst of saves sends one signal
+        self._lock_cache: Optional[Tuple[int, int]] = None  # (mtime_ns, pid)
+        self._notify_timer = QTimer(self)
+        self._notify_timer.setSingleShot(True)
+        self._notify_timer.setInterval(NOTIFY_DEBOUNCE_MS)
+        self._notify_timer.timeout.connect(self._send_reload_signal)  # type: ignore[arg-type]
+        self._preset_dialogs: Dict[bool, QFileDialog] = {}  # keyed by "save"
+
         # Prefer loading a preset named "Default.json" from presets directory if it exists
-        default_preset_path = (Path(__file__).resolve().parent / "presets" / "Default.json")
-        if default_preset_path.exists():
-            self._load_config(default_preset_path)
+        if DEFAULT_PRESET_PATH.exists():
+            self._load_config(DEFAULT_PRESET_PATH)
         else:
             # Fallback to generic config.json in app directory
             self._load_config(CONFIG_PATH)
@@ -857,19 +1071,13 @@ class ConfigEditor(QMainWindow):
     # --------------------------- config handling ---------------------------
 
     def _load_config(self, path: Path):
-        if not path.exists():
+        try:
+            st = path.stat()
+        except FileNotFoundError:
             QMessageBox.critical(self, "Error", f"File not found:\n{path}")
             return
         try:
-            with path.open("r", encoding="utf-8") as fh:
-                raw = fh.read()
-            # Strip // comments (same logic as midi_router)
-            clean_lines = []
-            for line in raw.splitlines():
-                if "//" in line and line.split("//")[0].count("\"") % 2 == 0:
-                    line = line.split("//", 1)[0]
-                clean_lines.append(line)
-            data = json.loads("\n".join(clean_lines))
+            data = copy.deepcopy(_parse_config(str(path), st.st_mtime_ns, st.st_size))
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load JSON:\n{e}")
             return
@@ -886,7 +1094,20 @@ class ConfigEditor(QMainWindow):
                 if hasattr(self.rand_settings, k):
                     setattr(self.rand_settings, k, v)
 
-        # Build scrollable area for patterns
+        # Remember current path
+        self._current_path = path
+
+        if self.pattern_widgets:
+            self._reload_patterns(patterns)
+        else:
+            self._build_patterns(patterns)
+
+        # Update preset name display if toolbar already built
+        if hasattr(self, "preset_name_edit"):
+            self._update_preset_name()
+
+    def _build_patterns(self, patterns: Dict[str, Dict[str, Any]]) -> None:
+        """Create the scrollable pattern list for the current output channels."""
         central = QWidget()
         vbox = QVBoxLayout()
         central.setLayout(vbox)
@@ -895,81 +1116,154 @@ class ConfigEditor(QMainWindow):
         inner = QWidget()
         inner_layout = QVBoxLayout()
         inner.setLayout(inner_layout)
-        scroll.setWidget(inner)
         vbox.addWidget(scroll)
-        self.setCentralWidget(central)
-
-        # Remember current path
-        self._current_path = path
+        self._pattern_layout = inner_layout
 
-        # Create pattern widgets
+        # Create pattern widgets while the container is detached, then hand
+        # it to the scroll area so its layout runs once
+        inner.setUpdatesEnabled(False)
         for pname, midi_ch in self._output_channels.items():
             pcfg = patterns.get(pname, {})
             pw = PatternWidget(pname, pcfg, midi_ch)
             inner_layout.addWidget(pw)
             self.pattern_widgets[pname] = pw
         inner_layout.addStretch()
+        inner.setUpdatesEnabled(True)
+        scroll.setWidget(inner)
+        self.setCentralWidget(central)
 
-        # Update preset name display if toolbar already built
-        if hasattr(self, "preset_name_edit"):
-            self._update_preset_name()
+    def _reload_patterns(self, patterns: Dict[str, Dict[str, Any]]) -> None:
+        """Update the existing pattern list in place: widgets whose name is in
+        the new preset are reloaded, others are created or removed."""
+        layout = self._pattern_layout
+        inner = layout.parentWidget()
+        # Reorder/insert with painting off so the list relayouts once
+        inner.setUpdatesEnabled(False)
+        old = self.pattern_widgets
+        for pw in old.values():
+            layout.removeWidget(pw)
+        new: Dict[str, PatternWidget] = {}
+        for pos, (pname, midi_ch) in enumerate(self._output_channels.items()):
+            pcfg = patterns.get(pname, {})
+            pw = old.pop(pname, None)
+            if pw is None:
+                pw = PatternWidget(pname, pcfg, midi_ch)
+            else:
+                pw.reload(pcfg, midi_ch)
+            layout.insertWidget(pos, pw)  # before the trailing stretch
+            new[pname] = pw
+        for pw in old.values():
+            pw.deleteLater()
+        self.pattern_widgets = new
+        inner.setUpdatesEnabled(True)
 
     # ------------------------------ actions --------------------------------
 
     def _collect_config(self) -> Dict[str, Any]:
-        out_channels: Dict[str, int] = {}
-        patterns: Dict[str, Dict[str, Any]] = {}
-        for pname, pw in self.pattern_widgets.items():
-            midi_ch, cfg = pw.export_data()
-            out_channels[pname] = midi_ch
-            patterns[pname] = cfg
+        exported = [(pname, pw.export_data()) for pname, pw in self.pattern_widgets.items()]
+        out_channels: Dict[str, int] = {pname: midi_ch for pname, (midi_ch, _) in exported}
+        patterns: Dict[str, Dict[str, Any]] = {pname: cfg for pname, (_, cfg) in exported}
         return {
             "input_channel": self._input_channel,
             "output_channels": out_channels,
             "patterns": patterns,
-            "random_settings": asdict(self.rand_settings),
+            # Shallow copy: only serialized, so no deep copy of patterns_enabled
+            "random_settings": dict(vars(self.rand_settings)),
         }
 
     def save_current(self):
         data = self._collect_config()
         try:
-            CONFIG_PATH.write_text(json.dumps(data, indent=2))
+            _write_atomic(CONFIG_PATH, dumps(data))
+            _parse_config.cache_clear()
             # Silent save – no confirmation dialog
             self._notify_router()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save:\n{e}")
 
+    def _preset_dialog(self, save: bool) -> QFileDialog:
+        """Open/Save preset dialog, created on first use and then reused."""
+        dialogs = self._preset_dialogs
+        dlg = dialogs.get(save)
+        if dlg is None:
+            dlg = QFileDialog(self, "Save preset" if save else "Open preset", str(PRESET_DIR), "JSON (*.json)")
+            if save:
+                dlg.setAcceptMode(QFileDialog.AcceptMode.AcceptSave)
+                dlg.setFileMode(QFileDialog.FileMode.AnyFile)
+            else:
+                dlg.setFileMode(QFileDialog.FileMode.ExistingFile)
+            dialogs[save] = dlg
+        return dlg
+
+    def _ask_preset_path(self, save: bool) -> Optional[Path]:
+        dlg = self._preset_dialog(save)
+        if not dlg.exec():
+            return None
+        files = dlg.selectedFiles()
+        return Path(files[0]) if files else None
+
     def save_as(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Save preset", str(PRESET_DIR), "JSON (*.json)")
-        if not path:
+        path = self._ask_preset_path(save=True)
+        if path is None:
             return
         data = self._collect_config()
         try:
-            Path(path).write_text(json.dumps(data, indent=2))
+            _write_atomic(path, dumps(data))
+            _parse_config.cache_clear()
             self._notify_router()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save:\n{e}")
 
     def open_preset(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Open preset", str(PRESET_DIR), "JSON (*.json)")
-        if not path:
+        path = self._ask_preset_path(save=False)
+        if path is None:
             return
-        # Clear current UI and reload
-        self.pattern_widgets.clear()
-        self.centralWidget().deleteLater()
-        self._load_config(Path(path))
+        # Existing pattern widgets are reused where names match
+        self._load_config(path)
 
     # --------------------------- router reload -----------------------------
 
     def _notify_router(self):
+        """Schedule a config reload in the running midi_router process.
+
+        Restarting the single-shot timer collapses rapid saves into one signal.
+        """
+        self._notify_timer.start()
+
+    def _send_reload_signal(self):
         """Send signal to running midi_router process prompting config reload."""
+        self._signal_router(RELOAD_SIGNAL)
+
+    def _router_pid(self) -> Optional[int]:
+        """PID from the router's lock file, or None if there is no router.
+
+        The file is only re-read when its mtime changes, so repeated sends
+        cost a single stat.
+        """
         try:
-            if LOCK_PATH.exists():
-                pid = int(LOCK_PATH.read_text())
-                os.kill(pid, RELOAD_SIGNAL)
+            st = LOCK_PATH.stat()
+        except OSError:
+            return None  # router not running
+        cache = self._lock_cache
+        if cache is not None and cache[0] == st.st_mtime_ns:
+            return cache[1]
+        try:
+            pid = int(LOCK_PATH.read_text())
+        except (OSError, ValueError):
+            return None
+        self._lock_cache = (st.st_mtime_ns, pid)
+        return pid
+
+    def _signal_router(self, signum: int) -> None:
+        """Send *signum* to the running midi_router process, if any."""
+        pid = self._router_pid()
+        if pid is None:
+            return
+        try:
+            os.kill(pid, signum)
         except Exception:
             # Non-fatal – router may not be running
-            pass
+            self._lock_cache = None
 
     def _build_toolbar(self):
         toolbar = QToolBar("TopBar", self)
@@ -984,9 +1278,8 @@ class ConfigEditor(QMainWindow):
         toolbar.addWidget(left_pad)
 
         # --- Master Power toggle ---
-        power_icon_path = Path(__file__).resolve().parent / "icons" / "ic_power.svg"
         self.master_enable_btn = QToolButton()
-        self.master_enable_btn.setIcon(QIcon(str(power_icon_path)))
+        self.master_enable_btn.setIcon(_icon("ic_power.svg"))
         self.master_enable_btn.setCheckable(True)
         self.master_enable_btn.setChecked(True)
         self.master_enable_btn.setStyleSheet(
@@ -1003,9 +1296,8 @@ class ConfigEditor(QMainWindow):
         toolbar.addWidget(btn_random)
 
         # Settings (gear) button next to random, uses custom SVG icon
-        icon_path = (Path(__file__).resolve().parent / "icons" / "ic_settings.svg")
         btn_settings = QPushButton()
-        btn_settings.setIcon(QIcon(str(icon_path)))
+        btn_settings.setIcon(_icon("ic_settings.svg"))
         btn_settings.setMinimumSize(QSize(40, 40))
         btn_settings.clicked.connect(self.open_random_settings)  # type: ignore[arg-type]
         toolbar.addWidget(btn_settings)
@@ -1024,17 +1316,15 @@ class ConfigEditor(QMainWindow):
         toolbar.addWidget(self.preset_name_edit)
 
         # Open preset icon button
-        open_icon = QIcon(str((Path(__file__).resolve().parent / "icons" / "ic_open.svg")))
         btn_open = QPushButton()
-        btn_open.setIcon(open_icon)
+        btn_open.setIcon(_icon("ic_open.svg"))
         btn_open.setMinimumSize(QSize(40, 40))
         btn_open.clicked.connect(self.open_preset)  # type: ignore[arg-type]
         toolbar.addWidget(btn_open)
 
         # Save As icon button
-        saveas_icon = QIcon(str((Path(__file__).resolve().parent / "icons" / "ic_save.svg")))
         btn_saveas = QPushButton()
-        btn_saveas.setIcon(saveas_icon)
+        btn_saveas.setIcon(_icon("ic_save.svg"))
         btn_saveas.setMinimumSize(QSize(40, 40))
         btn_saveas.clicked.connect(self.save_as)  # type: ignore[arg-type]
         toolbar.addWidget(btn_saveas)
@@ -1061,9 +1351,10 @@ class ConfigEditor(QMainWindow):
     def randomize_all(self, checked: bool = False):  # noqa: F841
         if not self._arp_enabled:
             return
-        for _name, pw in self.pattern_widgets.items():
+        settings = self.rand_settings
+        for pw in self.pattern_widgets.values():
             if pw.is_enabled():
-                pw.randomize(self.rand_settings)
+                pw.randomize(settings)
 
     # ----------------------- master enable handler -----------------------
 
@@ -1080,11 +1371,25 @@ class ConfigEditor(QMainWindow):
             self._prev_pattern_enabled = {name: pw.is_enabled() for name, pw in self.pattern_widgets.items()}
             for pw in self.pattern_widgets.values():
                 pw.set_enabled(False)
-        # save & notify router
-        self.save_current()
+        # A pending full reload would re-read the older config.json and undo
+        # the mask, so fold the change into that save instead
+        if ENABLE_SIGNAL is None or self._notify_timer.isActive():
+            self.save_current()
+        else:
+            self._save_enable_mask()
+
+    def _save_enable_mask(self) -> None:
+        """Send only the per-pattern enabled flags to the router."""
+        mask = {name: pw.is_enabled() for name, pw in self.pattern_widgets.items()}
+        try:
+            _write_atomic(ENABLE_PATH, dumps(mask, pretty=False))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to save:\n{e}")
+            return
+        self._signal_router(ENABLE_SIGNAL)
 
     def open_random_settings(self):
-        dlg = RandomSettingsDialog(self.rand_settings, list(self.pattern_widgets.keys()), self)
+        dlg = RandomSettingsDialog(self.rand_settings, self.pattern_widgets.keys(), self)
         dlg.exec()
 
     # --------------------------- preset name helper ------------------------
@@ -1094,7 +1399,7 @@ class ConfigEditor(QMainWindow):
         if hasattr(self, "preset_name_edit"):
             try:
                 preset_path: Path = Path(getattr(self, "_current_path", CONFIG_PATH))
-                if preset_path.resolve() == CONFIG_PATH.resolve():
+                if preset_path.resolve() == CONFIG_PATH_RESOLVED:
                     self.preset_name_edit.setText("New preset")
                 else:
                     self.preset_name_edit.setText(preset_path.stem)
@@ -1107,14 +1412,13 @@ class ConfigEditor(QMainWindow):
 
     def closeEvent(self, event):  # type: ignore[override]
         """On window close, terminate running midi_router process (if any)."""
-        try:
-            if LOCK_PATH.exists():
-                pid = int(LOCK_PATH.read_text())
-                # Avoid killing self
-                if pid and pid != os.getpid():
-                    os.kill(pid, signal.SIGTERM)
-        except Exception:
-            pass  # ignore errors
+        pid = self._router_pid()
+        # Avoid killing self
+        if pid and pid != os.getpid():
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except Exception:
+                pass  # ignore errors
         super().closeEvent(event)
 
 
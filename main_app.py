@@ -1,14 +1,21 @@
 import atexit
 from multiprocessing import Process, set_start_method
 import signal
+import sys
 from config_editor import main as editor_main
-from config_editor import RELOAD_SIGNAL
+from config_editor import ENABLE_SIGNAL, RELOAD_SIGNAL
 from midi_router import main as router_main
 
 
-# Use 'spawn' start method for compatibility with frozen executables.
+# Use 'spawn' start method for compatibility with frozen executables and
+# macOS (Qt frameworks are not fork-safe). On Linux 'fork' lets the router
+# reuse the already imported modules instead of re-importing PyQt6 and rtmidi.
+_START_METHOD = (
+    "fork" if sys.platform.startswith("linux") and not getattr(sys, "frozen", False)
+    else "spawn"
+)
 try:
-    set_start_method("spawn")
+    set_start_method(_START_METHOD)
 except RuntimeError:
     pass  # already set
 
@@ -37,6 +44,8 @@ def main():
     # Główny proces GUI ignoruje sygnał RELOAD_SIGNAL, żeby nie kończył aplikacji
     try:
         signal.signal(RELOAD_SIGNAL, lambda signum, frame: None)
+        if ENABLE_SIGNAL is not None:
+            signal.signal(ENABLE_SIGNAL, lambda signum, frame: None)
     except Exception:
         pass  # signal may not be available on platform
     editor_main()
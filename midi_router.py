@@ -14,93 +14,255 @@
   Nie wymaga komunikatów Start/Stop – choć nadal je obsługuje do opcjonalnego
   resetu transportu.
 
-Requires: ``mido`` + a backend such as ``python-rtmidi`` (declared in
-``requirements.txt``).
+Requires: ``python-rtmidi`` (declared in ``requirements.txt``).
 """
 
-import json
+from array import array
+from bisect import insort
+from collections import deque
+from contextlib import suppress
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple, Any
 
-import mido
-# Ensure rtmidi backend is included in frozen builds (PyInstaller)
-import mido.backends.rtmidi  # type: ignore  # noqa: F401
+import rtmidi  # type: ignore
+
+from serialization import loads, loads_jsonc
+import gc
 import sys
+import queue
+import logging
 import random
+import threading
 import os, signal, time
+
+try:  # POSIX only – the lock file falls back to O_EXCL creation without it
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore[assignment]
+from logging.handlers import QueueHandler, QueueListener
+from time import perf_counter_ns
+
+log = logging.getLogger("tr_router")
+
+
+def _env_int(name: str) -> Optional[int]:
+    """Non-negative int from environment variable *name*, or None if it is
+    unset. A malformed value is ignored with a warning, so a typo switches
+    the option off instead of stopping the router (and the app importing it).
+    """
+    raw = os.environ.get(name)
+    if not raw:
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        value = -1
+    if value < 0:
+        log.warning("Warning: ignoring %s=%r (expected a whole number ≥ 0)", name, raw)
+        return None
+    return value
+
+
 DEBUG_ARP = bool(os.environ.get("DEBUG_ARP"))
+# Opt-in: count a clock pulse the sender appears to have dropped
+CLOCK_COMPENSATION = bool(os.environ.get("ARP_CLOCK_COMP"))
+# Opt-in: most queued clock pulses played back-to-back after a stall; older
+# ones only advance the patterns silently (0 = play every pulse)
+CLOCK_CATCHUP = _env_int("ARP_CLOCK_CATCHUP") or 0
 
 # Lock file location (used for single instance + external control)
 LOCK_PATH = Path.home() / ".tr_router.lock"
+# How long a previous instance gets to exit after SIGTERM before SIGKILL,
+# and how often we check on it meanwhile
+SHUTDOWN_WAIT_S = 0.5
+SHUTDOWN_POLL_S = 0.02
+# How long we then wait for its lock to be released before giving up
+LOCK_WAIT_S = 2.0
 
 # ---------------------------------------------------------------------------
 # Live-reload support via SIGUSR1
 # ---------------------------------------------------------------------------
 
 RELOAD_SIGNAL = signal.SIGUSR1 if hasattr(signal, "SIGUSR1") else signal.SIGHUP
+# Lighter reload: only re-read the per-pattern enabled flags
+ENABLE_SIGNAL = getattr(signal, "SIGUSR2", None)
 
 # ---------------------------------------------------------------------------
 # Single-instance enforcement
 # ---------------------------------------------------------------------------
 
-def ensure_single_instance():
-    """Terminate previous running instance (if any) and create a lock file."""
-    if LOCK_PATH.exists():
+def _create_lock() -> None:
+    """Atomically create the lock file holding our PID.
+
+    Raises ``FileExistsError`` if another process already holds it.
+    """
+    fd = os.open(LOCK_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+    finally:
+        os.close(fd)
+
+
+def _read_lock_pid() -> Optional[int]:
+    """PID stored in the lock file, or None if it is missing or unreadable."""
+    try:
+        fd = os.open(LOCK_PATH, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        raw = os.read(fd, 32)
+    finally:
+        os.close(fd)
+    try:
+        return int(raw)
+    except ValueError:
+        return None
+
+
+def _flock_lock() -> Optional[int]:
+    """Open the lock file and take an exclusive ``flock`` on it.
+
+    Returns the open descriptor (the kernel drops the lock when it is
+    closed, even if the process dies), or None if another process holds it.
+    """
+    while True:
+        fd = os.open(LOCK_PATH, os.O_RDWR | os.O_CREAT, 0o644)
         try:
-            old_pid = int(LOCK_PATH.read_text())
-            if old_pid != os.getpid():
-                # Check if process is alive
-                try:
-                    os.kill(old_pid, 0)
-                except ProcessLookupError:
-                    pass  # not running
-                else:
-                    print(f"Found previous instance (PID {old_pid}), terminating…")
-                    try:
-                        os.kill(old_pid, signal.SIGTERM)
-                    except PermissionError:
-                        print("  Warning: insufficient permission to terminate old process.")
-                    # Wait a bit for graceful shutdown
-                    for _ in range(10):
-                        time.sleep(0.3)
-                        try:
-                            os.kill(old_pid, 0)
-                        except ProcessLookupError:
-                            break
-                    else:
-                        # force kill
-                        try:
-                            os.kill(old_pid, signal.SIGKILL)
-                        except Exception:
-                            pass
-        except Exception as e:
-            print(f"Error handling existing lock file: {e}")
-        # always remove stale lock
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        # The previous holder unlinks the file on exit; make sure we did not
+        # lock a file that is no longer the one at LOCK_PATH
         try:
-            LOCK_PATH.unlink(missing_ok=True)
-        except Exception:
+            if os.fstat(fd).st_ino == os.stat(LOCK_PATH).st_ino:
+                return fd
+        except FileNotFoundError:
             pass
+        os.close(fd)
 
-    # Create new lock with current pid
+
+def _stop_previous(old_pid: Optional[int]) -> None:
+    """SIGTERM the instance with *old_pid*, SIGKILL it if it does not exit."""
+    if old_pid is None or old_pid == os.getpid():
+        return
+    # Check if process is alive
     try:
-        LOCK_PATH.write_text(str(os.getpid()))
-    except Exception as e:
-        print(f"Warning: could not create lock file: {e}")
+        os.kill(old_pid, 0)
+    except ProcessLookupError:
+        return  # not running
+    log.info("Found previous instance (PID %d), terminating…", old_pid)
+    try:
+        os.kill(old_pid, signal.SIGTERM)
+    except PermissionError:
+        log.warning("  Warning: insufficient permission to terminate old process.")
+    # Wait a bit for graceful shutdown
+    deadline = time.monotonic() + SHUTDOWN_WAIT_S
+    while time.monotonic() < deadline:
+        time.sleep(SHUTDOWN_POLL_S)
+        try:
+            os.kill(old_pid, 0)
+        except ProcessLookupError:
+            break
+    else:
+        # force kill
+        with suppress(Exception):
+            os.kill(old_pid, signal.SIGKILL)
 
 
-def cleanup_lock():
+# Descriptor of the flock'ed lock file, held open while the router runs
+_lock_fd: Optional[int] = None
+
+
+def ensure_single_instance():
+    """Terminate previous running instance (if any) and take the lock file.
+
+    The file holds our PID for the config editor. Ownership is an ``flock``
+    on it, so a lock left behind by a crashed instance is free again and
+    its stale PID is never signalled. If the previous instance keeps the
+    lock, we exit rather than run unlocked next to it.
+    """
+    global _lock_fd
+    if fcntl is None:
+        _ensure_single_instance_pidfile()
+        return
+    try:
+        fd = _flock_lock()
+        if fd is None:
+            _stop_previous(_read_lock_pid())
+            # The kernel releases the lock only once the old process is gone
+            # (a SIGKILL is not instant either), so keep trying for a while
+            deadline = time.monotonic() + LOCK_WAIT_S
+            fd = _flock_lock()
+            while fd is None and time.monotonic() < deadline:
+                time.sleep(SHUTDOWN_POLL_S)
+                fd = _flock_lock()
+        if fd is None:
+            log.error("Error: another instance still holds %s – exiting", LOCK_PATH)
+            raise SystemExit(1)
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+    except OSError as e:
+        log.warning("Warning: could not create lock file: %s", e)
+        return
+    _lock_fd = fd
+
+
+def _ensure_single_instance_pidfile():
+    """ensure_single_instance() without fcntl: an O_EXCL-created PID file."""
     try:
-        if LOCK_PATH.exists():
-            if LOCK_PATH.read_text().strip() == str(os.getpid()):
-                LOCK_PATH.unlink()
-    except Exception:
+        _create_lock()
+        return
+    except FileExistsError:
         pass
+    except OSError as e:
+        log.warning("Warning: could not create lock file: %s", e)
+        return
+
+    try:
+        _stop_previous(_read_lock_pid())
+    except Exception as e:
+        log.error("Error handling existing lock file: %s", e)
+    # always remove stale lock
+    with suppress(Exception):
+        LOCK_PATH.unlink(missing_ok=True)
+
+    # Create new lock with current pid
+    try:
+        _create_lock()
+    except FileExistsError:
+        log.warning("Warning: another instance took the lock file while starting")
+    except OSError as e:
+        log.warning("Warning: could not create lock file: %s", e)
+
+
+def cleanup_lock():
+    global _lock_fd
+    if _lock_fd is not None:
+        # Unlinked while still locked, so nobody can lock the old file after
+        with suppress(OSError):
+            LOCK_PATH.unlink()
+        os.close(_lock_fd)
+        _lock_fd = None
+        return
+    with suppress(Exception):
+        if _read_lock_pid() == os.getpid():
+            LOCK_PATH.unlink()
 
 
 CONFIG_PATH = Path(__file__).with_name("config.json")
+ENABLE_PATH = CONFIG_PATH.with_name("config.enable.json")
+# Config changes are also picked up by polling its mtime, for when no
+# reload signal arrives (e.g. a hand-edited config.json)
+CONFIG_POLL_S = 0.5
 PPQN = 24                     # MIDI clock pulses per quarter note
 TICKS_PER_STEP = PPQN // 4    # 16-th note → 6 pulses
+SUBPULSES = 10                # pattern tick units per clock pulse (exact for d/t/q)
 MAX_NOTES = 8                 # maximum chord size
+MAX_STEPS = 16                # maximum pattern length
+
+# Raw Note Off message for every (channel, note), built once at import
+NOTE_OFF_TABLE = tuple(tuple((0x80 | ch, n, 0) for n in range(128)) for ch in range(16))
 
 # ---------------------------------------------------------------------------
 # Rhythm division helpers
@@ -117,7 +279,12 @@ DIVISION_BASE = {
 
 
 def parse_division(s: str) -> int:
-    """Convert division string like '1/8', '1/4d', '1/16t' into pulses per step."""
+    """Convert division string like '1/8', '1/4d', '1/16t' into the length of
+    one step in ticks of 1/SUBPULSES clock pulse.
+
+    Dotted, triplet and quintuplet steps are exact in these units, so a
+    pattern's tick can be counted in ints without drifting or rounding.
+    """
     s = s.strip().lower()
     dotted = s.endswith("d")
     triplet = s.endswith("t")
@@ -126,34 +293,152 @@ def parse_division(s: str) -> int:
         s_base = s[:-1]
     else:
         s_base = s
-    pulses = DIVISION_BASE.get(s_base, PPQN // 4)  # default 1/16
+    ticks = DIVISION_BASE.get(s_base, PPQN // 4) * SUBPULSES  # default 1/16
     if dotted:
-        pulses = int(pulses * 1.5)
+        ticks = ticks * 3 // 2
     elif triplet:
-        pulses = int(pulses * 2 / 3)
+        ticks = ticks * 2 // 3
     elif quint:
-        pulses = int(pulses * 4 / 5)
-    return max(1, pulses)
-
+        ticks = ticks * 4 // 5
+    return max(1, ticks)
+
+
+def _int_column(raw: List[Any], length: int, default: int, lo: int, hi: int,
+                marker: Optional[str] = None) -> List[Any]:
+    """Normalise one per-step config column to exactly *length* entries.
+
+    Values are clamped to lo..hi (unparsable ones become *default*), the
+    *marker* string (e.g. "R" or "T") is kept as is, and a short column is
+    padded with its last entry. An empty column is all *default*.
+    """
+    if not raw:
+        return [default] * length
+    column: List[Any] = []
+    for v in raw[:length]:
+        if marker is not None and isinstance(v, str) and v.upper() == marker:
+            column.append(marker)
+            continue
+        try:
+            num = int(v)
+        except (ValueError, TypeError):
+            num = default
+        column.append(max(lo, min(hi, num)))
+    if len(column) < length:
+        column += [column[-1]] * (length - len(column))
+    return column
+
+
+def _cycle_at(seq: List[Any], i: int, default: Any) -> Any:
+    """Item *i* of *seq*, wrapping around; *default* when *seq* is empty."""
+    return seq[i % len(seq)] if seq else default
+
+
+def _vel_spread(vrandom: int) -> Optional[int]:
+    """V-random percentage as used per step: None = fixed velocity,
+    -1 = any velocity, otherwise ± this much around the step velocity."""
+    if vrandom >= 100:
+        return -1
+    if vrandom > 0:
+        return int(vrandom * 127 / 100) // 2
+    return None
+
+
+def _vel_window(vel: int, spread: Optional[int]) -> Tuple[int, int]:
+    """(lowest velocity, number of velocities) a step picks from; a width of
+    0 means *vel* is played as is."""
+    if spread is None:
+        return vel, 0
+    if spread < 0:
+        return 1, 127
+    low = max(1, vel - spread)
+    return low, min(127, vel + spread) - low + 1
+
+
+class PatternConfig:
+    """One pattern from ``config.json``, compiled for the clock path.
+
+    ``rows`` holds one tuple per step with everything the clock path needs
+    already derived: chord index, velocity window (see ``_vel_window``),
+    velocity spread (see ``_vel_spread``, for "R" velocities whose window is
+    only known once drawn), s-prob, octave offset in semitones (pattern +
+    s-oct), R-Oct choices and gate length in pulses. The "X"/"R"/"T" tokens become
+    bits of the ``*_mask`` ints (bit *n* = step *n*), so playing a step
+    never inspects a string.
+    """
+
+    __slots__ = (
+        "length", "octave", "pulses", "enabled", "rows",
+        "rest_mask", "rand_mask", "vel_rand_mask", "tie_mask",
+    )
 
-def load_config() -> Tuple[int, Dict[str, int], Dict[str, Dict[str, Any]]]:
+    def __init__(
+        self,
+        length: int,
+        steps: List[Any],
+        velocity: List[Any],
+        vrandom: List[int],
+        sprob: List[int],
+        soct: List[int],
+        roct: List[str],
+        gate: List[Any],
+        octave: int,
+        pulses: int,
+        enabled: bool,
+    ):
+        self.length = length
+        self.octave = octave
+        self.pulses = pulses  # step length in ticks (see parse_division)
+        self.enabled = enabled  # updated in place by the enable mask
+        rest_mask = rand_mask = vel_rand_mask = tie_mask = 0
+        rows = []
+        for i in range(length):
+            bit = 1 << i
+            step = steps[i]
+            if isinstance(step, str):
+                token = step.strip().upper()
+                if token == "X":
+                    rest_mask |= bit
+                    step = 0
+                else:
+                    try:
+                        step = int(token)
+                    except ValueError:  # "R" and anything unreadable
+                        rand_mask |= bit
+                        step = 0
+            else:
+                step = int(step)
+            vel = _cycle_at(velocity, i, 100)
+            if isinstance(vel, str):  # "R"
+                vel_rand_mask |= bit
+                vel = 0
+            gate_pct = _cycle_at(gate, i, 100)
+            if isinstance(gate_pct, str):  # "T"
+                tie_mask |= bit
+                gate_pct = 100
+            spread = _vel_spread(_cycle_at(vrandom, i, 0))
+            rows.append((
+                step,
+                *_vel_window(vel, spread),
+                spread,
+                _cycle_at(sprob, i, 100),
+                (octave + _cycle_at(soct, i, 0)) * 12,
+                roct_choices(_cycle_at(roct, i, "0")),
+                pulses * gate_pct / (100.0 * SUBPULSES),
+            ))
+        self.rows = tuple(rows)
+        self.rest_mask = rest_mask
+        self.rand_mask = rand_mask
+        self.vel_rand_mask = vel_rand_mask
+        self.tie_mask = tie_mask
+
+
+def load_config() -> Tuple[int, Dict[str, int], Dict[str, PatternConfig]]:
     """Read ``config.json`` and return (input_channel, output_mapping, patterns_cfg)."""
     if not CONFIG_PATH.exists():
         raise FileNotFoundError(f"Config file not found at {CONFIG_PATH}")
 
-    raw = CONFIG_PATH.read_text()
     # Allow "//" style comments in JSON for convenience.
-    filtered_lines = []
-    for line in raw.splitlines():
-        # Remove everything after // but keep http:// etc. by checking for quotes
-        if "//" in line:
-            parts = line.split("//", 1)
-            before = parts[0]
-            # if // occurs inside quotes, keep it
-            if before.count("\"") % 2 == 0:
-                line = before
-        filtered_lines.append(line)
-    data = json.loads("\n".join(filtered_lines))
+    data = loads_jsonc(CONFIG_PATH.read_bytes())
     in_ch = int(data.get("input_channel", 1)) - 1  # convert to 0-based
     out_map = {name: int(ch) - 1 for name, ch in data.get("output_channels", {}).items()}
     if not out_map:
@@ -170,13 +455,13 @@ def load_config() -> Tuple[int, Dict[str, int], Dict[str, Dict[str, Any]]]:
             steps = list(range(8, 0, -1))
         return {"length": len(steps), "steps": steps, "enabled": True}
 
-    patterns_cfg: Dict[str, Dict[str, Any]] = {}
+    patterns_cfg: Dict[str, PatternConfig] = {}
     for pname in out_map.keys():
         pconf = patterns_raw.get(pname) or patterns_raw.get(pname.lower().replace(" ", ""))
         if not pconf:
             pconf = default_pattern(pname)
         length = int(pconf.get("length", len(pconf.get("steps", []))))
-        steps_list = pconf.get("steps", [])[:16]
+        steps_list = pconf.get("steps", [])[:MAX_STEPS]
         octave_shift = int(pconf.get("oktawa", 0))  # -2..2
         velocity_list_raw = pconf.get("velocity", pconf.get("velocities", []))
         if not steps_list:
@@ -189,67 +474,12 @@ def load_config() -> Tuple[int, Dict[str, int], Dict[str, Dict[str, Any]]]:
         # Enabled flag
         enabled_flag = bool(pconf.get("enabled", True))
 
-        # Prepare velocity list
-        if not velocity_list_raw:
-            velocity_list = [100] * length
-        else:
-            velocity_list = []
-            for v in velocity_list_raw[:length]:
-                if isinstance(v, str) and v.upper() == "R":
-                    velocity_list.append("R")
-                else:
-                    try:
-                        num = int(v)
-                    except ValueError:
-                        num = 100
-                    velocity_list.append(max(1, min(127, num)))
-            if len(velocity_list) < length:
-                velocity_list += [velocity_list[-1]] * (length - len(velocity_list))
-
-        # Prepare vrandom list (0-100)
-        vrandom_raw = pconf.get("v-random", pconf.get("vrandom", []))
-        if not vrandom_raw:
-            vrandom_list = [0] * length
-        else:
-            vrandom_list = []
-            for v in vrandom_raw[:length]:
-                try:
-                    val = int(v)
-                except (ValueError, TypeError):
-                    val = 0
-                vrandom_list.append(max(0, min(100, val)))
-            if len(vrandom_list) < length:
-                vrandom_list += [vrandom_list[-1]] * (length - len(vrandom_list))
-
-        # Prepare s-prob list (0-100)
-        sprob_raw = pconf.get("s-prob", pconf.get("sprob", []))
-        if not sprob_raw:
-            sprob_list = [100] * length
-        else:
-            sprob_list = []
-            for v in sprob_raw[:length]:
-                try:
-                    val = int(v)
-                except (ValueError, TypeError):
-                    val = 100
-                sprob_list.append(max(0, min(100, val)))
-            if len(sprob_list) < length:
-                sprob_list += [sprob_list[-1]] * (length - len(sprob_list))
-
-        # Prepare s-oct list (-2..2)
-        soct_raw = pconf.get("s-oct", pconf.get("soct", []))
-        if not soct_raw:
-            soct_list = [0] * length
-        else:
-            soct_list = []
-            for v in soct_raw[:length]:
-                try:
-                    val = int(v)
-                except (ValueError, TypeError):
-                    val = 0
-                soct_list.append(max(-2, min(2, val)))
-            if len(soct_list) < length:
-                soct_list += [soct_list[-1]] * (length - len(soct_list))
+        # Per-step columns: velocity 1-127 or 'R', v-random and s-prob 0-100,
+        # s-oct -2..2
+        velocity_list = _int_column(velocity_list_raw, length, 100, 1, 127, "R")
+        vrandom_list = _int_column(pconf.get("v-random", pconf.get("vrandom", [])), length, 0, 0, 100)
+        sprob_list = _int_column(pconf.get("s-prob", pconf.get("sprob", [])), length, 100, 0, 100)
+        soct_list = _int_column(pconf.get("s-oct", pconf.get("soct", [])), length, 0, -2, 2)
 
         # Prepare r-oct list (strings tokens)
         roct_raw = pconf.get("r-oct", pconf.get("roct", []))
@@ -264,47 +494,88 @@ def load_config() -> Tuple[int, Dict[str, int], Dict[str, Dict[str, Any]]]:
         pulses_val = parse_division(division_str)
 
         # ---------------- Gate list (1-100 %) or 'T' for tie ----------------
-        gate_raw = pconf.get("gate", [])
-        if not gate_raw:
-            gate_list = [100] * length
-        else:
-            gate_list: List[Any] = []  # may contain int or 'T'
-            for v in gate_raw[:length]:
-                if isinstance(v, str) and v.upper() == "T":
-                    gate_list.append("T")
-                    continue
-                try:
-                    g_val = int(v)
-                except (ValueError, TypeError):
-                    g_val = 100
-                gate_list.append(max(1, min(100, g_val)))
-            if len(gate_list) < length:
-                gate_list += [gate_list[-1]] * (length - len(gate_list))
-
-        patterns_cfg[pname] = {
-            "length": max(1, min(16, length)),
-            "steps": steps_list,
-            "octave": max(-5, min(5, octave_shift)),  # clamp defensively
-            "velocity": velocity_list,
-            "vrandom": vrandom_list,
-            "sprob": sprob_list,
-            "soct": soct_list,
-            "roct": roct_list,
-            "gate": gate_list,
-            "pulses": float(pulses_val),
-            "enabled": enabled_flag,
-        }
+        gate_list = _int_column(pconf.get("gate", []), length, 100, 1, 100, "T")
+
+        patterns_cfg[pname] = PatternConfig(
+            max(1, min(MAX_STEPS, length)),
+            steps_list,
+            velocity_list,
+            vrandom_list,
+            sprob_list,
+            soct_list,
+            roct_list,
+            gate_list,
+            octave=max(-5, min(5, octave_shift)),  # clamp defensively
+            pulses=pulses_val,
+            enabled=enabled_flag,
+        )
 
     return in_ch, out_map, patterns_cfg
 
 
-def create_output_ports(out_map: Dict[str, int]):
-    """Return dict {name: (mido.Output, channel)} for each pattern output."""
+def config_stamp() -> Optional[Tuple[int, int, int]]:
+    """(mtime_ns, size, inode) of ``config.json``, or None if it cannot be
+    stat'ed.
+
+    The editor saves by replacing the file, so the inode tells saves apart
+    even where coarse timestamps give two of them the same mtime and size.
+    """
+    try:
+        st = CONFIG_PATH.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def load_enable_mask() -> Dict[str, bool]:
+    """Read the ``{pattern name: enabled}`` file written by the editor."""
+    return {name: bool(flag) for name, flag in loads(ENABLE_PATH.read_bytes()).items()}
+
+
+class OutputPort:
+    """Virtual rtmidi output bound to one MIDI channel.
+
+    Note messages are sent as raw bytes: Note On fills a reused buffer and
+    Note Offs come from the shared prebuilt table, so the clock path never
+    builds a message object. ``send``, ``on_status`` and ``offs`` are public
+    for the clock path, which queues messages and sends them in one burst.
+    """
+
+    __slots__ = ("channel", "_rt", "send", "on_status", "_on_buf", "offs", "_all_off")
+
+    def __init__(self, name: str, channel: int):
+        self.channel = channel
+        self._rt = rtmidi.MidiOut()
+        self._rt.open_virtual_port(name)
+        self.send = self._rt.send_message
+        self.on_status = 0x90 | channel
+        # rtmidi copies the bytes on send, so one buffer serves every Note On
+        self._on_buf = [self.on_status, 0, 0]
+        self.offs = NOTE_OFF_TABLE[channel]
+        self._all_off = (0xB0 | channel, 123, 0)  # CC123 All Notes Off
+
+    def note_on(self, note: int, velocity: int) -> None:
+        buf = self._on_buf
+        buf[1] = note
+        buf[2] = velocity
+        self.send(buf)
+
+    def note_off(self, note: int) -> None:
+        self.send(self.offs[note])
+
+    def all_notes_off(self) -> None:
+        self.send(self._all_off)
+
+    def close(self) -> None:
+        self._rt.close_port()
+
+
+def create_output_ports(out_map: Dict[str, int]) -> Dict[str, OutputPort]:
+    """Return dict {name: OutputPort} for each pattern output."""
     ports = {}
     for name, ch in out_map.items():
-        port = mido.open_output(name, virtual=True)  # type: ignore[attr-defined]
-        ports[name] = (port, ch)
-        print(f"Opened virtual output '{name}' on channel {ch + 1}")
+        ports[name] = OutputPort(name, ch)
+        log.info("Opened virtual output '%s' on channel %d", name, ch + 1)
     return ports
 
 
@@ -313,49 +584,230 @@ def create_output_ports(out_map: Dict[str, int]):
 # ---------------------------------------------------------------------------
 
 
-def pick_roct(token: str) -> int:
-    """Convert R-Oct token to random octave shift (-2..2)."""
+ROCT_NONE = frozenset(("0", "", "0.0"))
+ROCT_CHOICES = {
+    "+1": (0, 1),
+    "+2": (0, 1, 2),
+    "-1": (0, -1),
+    "-2": (0, -1, -2),
+    "+-1": (-1, 0, 1),
+    "+-2": (-2, -1, 0, 1, 2),
+}
+_ROCT_UNKNOWN = (0,)
+
+
+def roct_choices(token: str) -> Optional[Tuple[int, ...]]:
+    """Octave shifts (-2..2) an R-Oct token picks from; None for no shift."""
     token = token.strip()
-    if token in ("0", "", "0.0"):
-        return 0
-    mapping = {
-        "+1": [0, 1],
-        "+2": [0, 1, 2],
-        "-1": [0, -1],
-        "-2": [0, -1, -2],
-        "+-1": [-1, 0, 1],
-        "+-2": [-2, -1, 0, 1, 2],
-    }
-    choices = mapping.get(token, [0])
-    return random.choice(choices)
+    if token in ROCT_NONE:
+        return None
+    return ROCT_CHOICES.get(token, _ROCT_UNKNOWN)
 
 
 # ---------------------------------------------------------------------------
 # Runtime helpers
 # ---------------------------------------------------------------------------
 
-def add_note(chord: List[int], note: int):
-    """Insert *note* into *chord* keeping ascending order and size ≤ MAX_NOTES."""
-    if note in chord:
-        return
-    chord.append(note)
-    chord.sort()
-    if len(chord) > MAX_NOTES:
-        # Keep the *lowest* MAX_NOTES notes (spec: ignore extra >8)
-        del chord[MAX_NOTES:]
+class Chord:
+    """Held notes: a 128-bit mask of note numbers plus the sorted list the
+    arpeggiator indexes.
+
+    The mask answers "is this note held?" with one shift, so repeated or
+    stray note messages never scan the list.
+    """
+
+    __slots__ = ("notes", "mask")
+
+    def __init__(self):
+        self.notes: List[int] = []  # ascending, at most MAX_NOTES
+        self.mask = 0
+
+    def add(self, note: int) -> None:
+        """Insert *note* keeping ascending order and size ≤ MAX_NOTES."""
+        if self.mask >> note & 1:
+            return
+        notes = self.notes
+        if len(notes) == MAX_NOTES:
+            # Keep the *lowest* MAX_NOTES notes (spec: ignore extra >8)
+            if note > notes[-1]:
+                return
+            self.mask &= ~(1 << notes.pop())
+        insort(notes, note)
+        self.mask |= 1 << note
+
+    def remove(self, note: int) -> None:
+        """Remove *note* if held."""
+        if self.mask >> note & 1:
+            self.mask &= ~(1 << note)
+            self.notes.remove(note)
+
+
+CLOCK_WINDOW = 8        # recent pulse intervals kept for the median
+CLOCK_DROPPED = 1.75    # gap (× median) from which one pulse counts as dropped
+CLOCK_PAUSED = 2.5      # gap (× median) from which the clock counts as paused
+
+
+class ClockTracker:
+    """Timestamps incoming clock pulses to recover a single dropped one.
+
+    A gap of about two median intervals means the sender (or the MIDI
+    transport) lost a pulse, so that pulse is played as two and the step
+    grid stays aligned. Longer gaps are taken as a paused clock.
+    """
+
+    __slots__ = ("_last", "_intervals")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self._last: Optional[int] = None
+        self._intervals: "deque[int]" = deque(maxlen=CLOCK_WINDOW)
+
+    def pulses(self, now_ns: int) -> int:
+        """Number of pulses the clock message received at *now_ns* stands for."""
+        last = self._last
+        self._last = now_ns
+        if last is None:
+            return 1
+        gap = now_ns - last
+        intervals = self._intervals
+        count = 1
+        if len(intervals) == CLOCK_WINDOW:
+            median = sorted(intervals)[CLOCK_WINDOW // 2]
+            if median > 0 and median * CLOCK_DROPPED <= gap < median * CLOCK_PAUSED:
+                count = 2
+        # The raw gap goes in either way, so a real tempo drop wins the
+        # median within a few pulses
+        intervals.append(gap)
+        return count
+
+
+class PatternRT:
+    """Playback state of one pattern, reset on reload."""
+
+    __slots__ = (
+        "tick", "step", "rand", "rand_vel", "note_on", "gate_left",
+        "tie_prev", "pending_off", "pending_left",
+    )
+
+    def __init__(self):
+        self.rewind()
+        self.note_on: Optional[int] = None  # note currently sounding
+        self.gate_left = 0.0                # pulses until Note Off; -1 = tied
+        self.tie_prev = False
+        self.pending_off: Optional[int] = None  # tied note overlapping the next
+        self.pending_left = 0.0
+
+    def rewind(self) -> None:
+        """Back to step 0 with fresh random draws."""
+        self.tick = 0  # ticks into the current step (see parse_division)
+        self.step = 0
+        # Chord index / velocity drawn for each "R" step this cycle
+        self.rand = array("b", _NO_DRAWS)
+        self.rand_vel = array("b", _NO_DRAWS)
+
+
+# Per-step random draws of a fresh cycle: -1 = not drawn yet
+_NO_DRAWS = array("b", [-1]) * MAX_STEPS
+
+
+_RELOAD = object()       # event: re-read config.json
+_ENABLE_MASK = object()  # event: re-read the enable mask only
+
+
+def _on_midi_input(event: Tuple[List[int], float], events: "queue.SimpleQueue[Any]") -> None:
+    """rtmidi callback (backend thread): hand the raw message to the main thread."""
+    events.put(event[0])
+
+
+def _on_midi_input_timed(event: Tuple[List[int], float], events: "queue.SimpleQueue[Any]") -> None:
+    """Like ``_on_midi_input``, but a clock pulse also carries its arrival
+    time (``perf_counter_ns``) as a second item for the ClockTracker, so a
+    stall of the main thread is not mistaken for a dropped pulse."""
+    message = event[0]
+    if message[0] == 0xF8:
+        message.append(perf_counter_ns())
+    events.put(message)
+
+
+def _watch_config(stamp: Optional[Tuple[int, int, int]], events: "queue.SimpleQueue[Any]") -> None:
+    """Poll config.json's mtime so changes without a reload signal (e.g. a
+    hand-edited file) are picked up too."""
+    while True:
+        time.sleep(CONFIG_POLL_S)
+        current = config_stamp()
+        if current != stamp:
+            stamp = current
+            events.put(_RELOAD)
+
 
+# Real-time priority for the thread running the arpeggiator (Linux only)
+RT_PRIORITY = 20
+# Opt-in: CPU the arpeggiator thread is pinned to (ideally an isolated one)
+PIN_CPU = _env_int("TR_CPU")
 
-def remove_note(chord: List[int], note: int):
-    """Remove note from chord list if present."""
+
+def raise_thread_priority() -> bool:
+    """Best effort: put the calling thread under SCHED_FIFO.
+
+    Needs CAP_SYS_NICE (or an rtprio limit); without it, or off Linux,
+    the thread keeps its normal priority.
+    """
     try:
-        chord.remove(note)
-    except ValueError:
-        pass
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(RT_PRIORITY))  # type: ignore[attr-defined]
+    except (AttributeError, OSError):
+        return False
+    return True
+
+
+def pin_thread_cpu(cpu: int) -> bool:
+    """Best effort: keep the calling thread on CPU *cpu* only (Linux)."""
+    try:
+        os.sched_setaffinity(0, {cpu})  # type: ignore[attr-defined]
+    except (AttributeError, OSError):
+        return False
+    return True
+
+
+# While the loop runs, generation 0 is collected only after this many net
+# allocations (default 700), and the collector thread sweeps up the rest
+GC_THRESHOLD = (100_000, 50, 50)
+GC_INTERVAL_S = 5.0
+
+
+def _collect_garbage() -> None:
+    """Run the cyclic collector on a timer instead of on allocation count."""
+    while True:
+        time.sleep(GC_INTERVAL_S)
+        gc.collect()
 
 
-def dbg(msg: str):
-    if DEBUG_ARP:
-        print(msg, flush=True)
+def quiet_gc() -> None:
+    """Move start-up objects out of the collector's view and stop it from
+    triggering on the clock path."""
+    gc.collect()
+    gc.freeze()
+    gc.set_threshold(*GC_THRESHOLD)
+    threading.Thread(target=_collect_garbage, daemon=True).start()
+
+
+def start_logging() -> QueueListener:
+    """Send router messages through a queue to a printer thread, so the
+    thread running the arpeggiator never blocks on console output.
+
+    The level comes from ``TR_LOG`` (default INFO, or DEBUG with DEBUG_ARP).
+    """
+    level = os.environ.get("TR_LOG") or ("DEBUG" if DEBUG_ARP else "INFO")
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    records: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+    log.handlers[:] = [QueueHandler(records)]
+    log.setLevel(level.upper())
+    log.propagate = False
+    listener = QueueListener(records, handler)
+    listener.start()
+    return listener
 
 
 # ---------------------------------------------------------------------------
@@ -363,35 +815,41 @@ def dbg(msg: str):
 # ---------------------------------------------------------------------------
 
 
-def main():
+def run_router():
     ensure_single_instance()
+    loaded_stamp = config_stamp()
     in_channel, out_map, pattern_cfgs = load_config()
     outputs = create_output_ports(out_map)
 
-    # Live-reload flag set by signal handler
-    reload_requested = False
+    # Incoming MIDI (from the rtmidi callback thread) and reload requests
+    # (from signal handlers and the config watcher) are queued here and
+    # processed in order by the main thread
+    events: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
 
     def _handle_reload(signum, frame):  # type: ignore[unused-arg]
-        nonlocal reload_requested
-        reload_requested = True
+        events.put(_RELOAD)
+
+    def _handle_enable(signum, frame):  # type: ignore[unused-arg]
+        events.put(_ENABLE_MASK)
 
     try:
         signal.signal(RELOAD_SIGNAL, _handle_reload)
+        if ENABLE_SIGNAL is not None:
+            signal.signal(ENABLE_SIGNAL, _handle_enable)
         # Graceful termination handler – ensure Note Offs sent
         def _handle_terminate(signum, frame):  # type: ignore[unused-arg]
             # Send Note Off for any sounding notes
             try:
-                for pname, rt in pattern_state.items():
-                    if rt.get("note_on") is not None and pname in outputs:
-                        port, ch = outputs[pname]
-                        port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
+                for _name, _cfg, rt, out in pattern_table:
+                    if rt.note_on is not None:
+                        out.note_off(rt.note_on)
                         # Optionally send All Notes Off CC123
-                        port.send(mido.Message("control_change", control=123, value=0, channel=ch))
+                        out.all_notes_off()
             except Exception:
                 pass
             try:
-                for port, _ch in outputs.values():
-                    port.close()
+                for out in outputs.values():
+                    out.close()
             except Exception:
                 pass
             cleanup_lock()
@@ -400,474 +858,570 @@ def main():
         signal.signal(signal.SIGTERM, _handle_terminate)
         signal.signal(signal.SIGINT, _handle_terminate)
     except Exception as e:
-        print(f"Warning: cannot set reload signal handler: {e}")
-
-    # Map pattern names → behaviour functions
-    pattern_order = {
-        "Pattern 1": lambda idx, ln: idx,                   # ascending 1→8
-        "Pattern 2": lambda idx, ln: ln - 1 - idx           # descending 8→1
-    }
+        log.warning("Warning: cannot set reload signal handler: %s", e)
 
     # Runtime state
-    chord_notes: List[int] = []  # current chord (sorted)
-    last_played: Dict[str, Optional[int]] = {name: None for name in outputs}
+    chord = Chord()
+    chord_notes = chord.notes  # current chord (sorted), updated in place
+    clock = ClockTracker() if CLOCK_COMPENSATION else None
 
     # Per-pattern runtime (independent clocks)
-    pattern_state: Dict[str, Dict[str, Any]] = {}
-    for name, cfg in pattern_cfgs.items():
-        pattern_state[name] = {
-            "tick": 0.0,
-            "step": 0,
-            "rand": [],
-            "rand_vel": [],
-            "note_on": None,
-            "gate_left": 0.0,
-            "tie_prev": False,
-            "pending_off": None,
-            "pending_left": 0.0,
-        }
+    pattern_state: Dict[str, PatternRT] = {name: PatternRT() for name in pattern_cfgs}
+
+    def build_table() -> List[Tuple[str, PatternConfig, PatternRT, OutputPort]]:
+        """One (name, cfg, runtime state, output) row per pattern, so the
+        clock path walks a list by pattern id instead of three dicts by name."""
+        return [(name, cfg, pattern_state[name], outputs[name]) for name, cfg in pattern_cfgs.items()]
+
+    pattern_table = build_table()
+    # Last note each pattern played, by pattern id; -1 = none
+    last_played = array("h", [-1]) * len(pattern_table)
+    # Bit per pattern id with a gate countdown or tie overlap running
+    timed_mask = 0
+    # Clock pulses that cannot fire any step yet, and pulses already taken
+    # that way but not yet added to the patterns' ticks (see settle())
+    quiet = 0
+    lag = 0
 
     # -------------------------------------------------------------------
     # Helper to play one step immediately (used on START and chord enter)
     # -------------------------------------------------------------------
 
-    def play_pattern_step(pattern_name: str):
-        """Send note for current step of pattern immediately."""
-        cfg = pattern_cfgs[pattern_name]
-        if not cfg.get("enabled", True):
+    def play_pattern_step(pid: int):
+        """Send note for current step of pattern *pid* immediately."""
+        nonlocal timed_mask
+        pattern_name, cfg, rt, out = pattern_table[pid]
+        if not cfg.enabled:
             # pattern disabled – ensure any playing note is turned off
-            rt = pattern_state[pattern_name]
-            if rt["note_on"] is not None:
-                port, ch = outputs[pattern_name]
-                port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
-                rt["note_on"] = None
-                rt["gate_left"] = 0.0
+            if rt.note_on is not None:
+                out.note_off(rt.note_on)
+                rt.note_on = None
+                rt.gate_left = 0.0
             return
-        rt = pattern_state[pattern_name]
-        plen = cfg["length"]
-        steps = cfg["steps"]
-        velocities = cfg["velocity"]
-        vrands = cfg["vrandom"]
-        gates = cfg["gate"]
-
-        if plen == 0 or not steps or not chord_notes:
+        plen = cfg.length
+
+        if not chord_notes:
             return
 
-        step_pos = rt["step"] % plen
+        step_pos = rt.step  # kept in 0..plen-1 by the ring advance below
+        bit = 1 << step_pos
 
         # reset caches if step 0 (fresh loop)
         if step_pos == 0:
-            rt["rand"] = [None] * len(steps)
-            rt["rand_vel"] = [None] * len(velocities)
+            rt.rand[:] = _NO_DRAWS
+            rt.rand_vel[:] = _NO_DRAWS
 
         ln = len(chord_notes)
-        step_val = steps[step_pos]
+        step_val, vel_low, vel_width, spread, _sprob, _semis, _roct, gate_len = cfg.rows[step_pos]
 
         # note index resolution
-        if isinstance(step_val, str):
-            if step_val.upper() == "X":
-                return  # rest – do nothing
-            if step_val.upper() == "R":
-                if len(rt["rand"]) < len(steps):
-                    rt["rand"] += [None]*(len(steps)-len(rt["rand"]))
-                if rt["rand"][step_pos] is None:  # type: ignore[index]
-                    rt["rand"][step_pos] = random.randint(1, ln)  # type: ignore[index,assignment]
-                idx = rt["rand"][step_pos]
-            else:
-                idx = int(step_val)
+        if cfg.rest_mask & bit:
+            return  # rest – do nothing
+        if cfg.rand_mask & bit:
+            rand = rt.rand
+            idx = rand[step_pos]
+            if idx < 0:
+                idx = rand[step_pos] = 1 + int(random.random() * ln)
         else:
-            idx = int(step_val)
+            idx = step_val
 
-        if idx is None or not (1 <= idx <= ln):
+        if not (1 <= idx <= ln):
             return
 
         # velocity resolution
-        vel_val = velocities[step_pos % len(velocities)] if velocities else 100
-        vrand_val = vrands[step_pos % len(vrands)] if vrands else 0
-
-        if isinstance(vel_val, str) and vel_val.upper() == "R":
-            base_vel = random.randint(1, 127)
-        else:
-            base_vel = int(vel_val)
-
-        if vrand_val >= 100:
-            vel = random.randint(1, 127)
-        elif vrand_val > 0:
-            span = int(vrand_val * 127 / 100)
-            half = span // 2
-            vel = random.randint(max(1, base_vel - half), min(127, base_vel + half))
-        else:
-            vel = base_vel
+        if cfg.vel_rand_mask & bit:
+            vel_low, vel_width = _vel_window(1 + int(random.random() * 127), spread)
+        vel = vel_low + int(random.random() * vel_width) if vel_width else vel_low
 
         # octave shift
-        note_num = chord_notes[idx - 1] + cfg["octave"] * 12
+        note_num = chord_notes[idx - 1] + cfg.octave * 12
         if not (0 <= note_num <= 127):
             return
 
-        port, ch = outputs[pattern_name]
-        dbg(f"{pattern_name} step={step_pos} NOTE_ON {note_num} ch={ch+1}")
-        port.send(mido.Message("note_on", note=note_num, velocity=vel, channel=ch))
+        if DEBUG_ARP:
+            log.debug("%s step=%d NOTE_ON %d ch=%d", pattern_name, step_pos, note_num, out.channel + 1)
+        out.note_on(note_num, vel)
 
         # Register playing note & gate so countdown can turn it off correctly
-        rt["note_on"] = note_num
-        gate_val = gates[step_pos % len(gates)] if gates else 100
-        if isinstance(gate_val, str) and str(gate_val).upper() == "T":
-            rt["gate_left"] = -1.0  # sustain until non-tie
-            rt["tie_prev"] = True
+        rt.note_on = note_num
+        if cfg.tie_mask & bit:
+            rt.gate_left = -1.0  # sustain until non-tie
+            rt.tie_prev = True
         else:
-            try:
-                gate_pct = int(gate_val)
-            except Exception:
-                gate_pct = 100
-            rt["gate_left"] = cfg["pulses"] * gate_pct / 100.0
-            rt["tie_prev"] = False
+            rt.gate_left = gate_len
+            rt.tie_prev = False
+            timed_mask |= 1 << pid
 
-        last_played[pattern_name] = note_num
+        last_played[pid] = note_num
 
         # advance step for next cycle counting
-        rt["step"] = (rt["step"] + 1) % plen
+        rt.step = 0 if step_pos + 1 == plen else step_pos + 1
+
+    def reload_config() -> None:
+        """Re-read config.json, reopening ports if the mapping changed."""
+        nonlocal loaded_stamp, outputs, pattern_cfgs, pattern_table, last_played, timed_mask
+        nonlocal quiet, lag
+        stamp = config_stamp()
+        # The watcher may already have loaded the file a signal announces;
+        # every save replaces the file, so a new inode tells them apart
+        if stamp == loaded_stamp:
+            return
+        loaded_stamp = stamp
+        try:
+            _in, new_out_map, new_cfgs = load_config()
 
-    input_name = "TR Router In"
-    print(
-        f"Creating virtual input '{input_name}' listening on MIDI channel {in_channel + 1}\n"
-        f"• Send START/STOP and CLOCK from your DAW to this port to drive the arpeggiator.\n"
-        f"• Play chords (≤8 notes) on the same channel to generate arpeggios."
-    )
+            # Send NOTE_OFF for any playing notes before resetting state,
+            # while the ports they were sent on are still open
+            silence_all()
 
-    with mido.open_input(input_name, virtual=True) as in_port:  # type: ignore[attr-defined]
-        try:
-            for msg in in_port:
-                # -------------------------------------------------- reload --
-                if reload_requested:
-                    reload_requested = False
+            # Recreate output ports if mapping changed
+            if new_out_map != out_map:
+                # Close existing ports
+                for out in outputs.values():
                     try:
-                        _in, new_out_map, new_cfgs = load_config()
-
-                        # Recreate output ports if mapping changed
-                        if new_out_map != out_map:
-                            # Close existing ports
-                            for port, _ch in outputs.values():
-                                try:
-                                    port.close()
-                                except Exception:
-                                    pass
-                            outputs = create_output_ports(new_out_map)  # type: ignore[assignment]
-                            out_map.clear()
-                            out_map.update(new_out_map)
-                            # Reset last_played to match new outputs
-                            last_played.clear()
-                            last_played.update({name: None for name in outputs})
-
-                        pattern_cfgs = new_cfgs  # type: ignore[assignment]
-
-                        # Send NOTE_OFF for any playing notes before resetting state
-                        for pname_old, rt_old in pattern_state.items():
-                            if rt_old.get("note_on") is not None and pname_old in outputs:
-                                try:
-                                    port, ch = outputs[pname_old]
-                                    port.send(mido.Message("note_off", note=rt_old["note_on"], velocity=0, channel=ch))
-                                except Exception:
-                                    pass
-
-                        # Recreate/refresh pattern_state dict
-                        pattern_state.clear()
-                        for name, cfg in pattern_cfgs.items():
-                            pattern_state[name] = {
-                                "tick": 0.0,
-                                "step": 0,
-                                "rand": [],
-                                "rand_vel": [],
-                                "note_on": None,
-                                "gate_left": 0.0,
-                                "tie_prev": False,
-                                "pending_off": None,
-                                "pending_left": 0.0,
-                            }
-
-                        print("Configuration reloaded from config.json (ports and patterns updated)")
-                    except Exception as err:
-                        print(f"Failed to reload configuration: {err}")
-                # ----------------------------- Clock & transport handling ----
-                if msg.type == "clock":
-                    if not chord_notes:
-                        # stop any sustained notes if chord empty
-                        for pname, rt in pattern_state.items():
-                            if rt["note_on"] is not None:
-                                port, ch = outputs[pname]
-                                if DEBUG_ARP:
-                                    print(f"{pname} NOTE_OFF {rt['note_on']} ch={ch+1}")
-                                port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
-                                rt["note_on"] = None
-                                rt["gate_left"] = 0.0
-                            last_played[pname] = None
-                        continue
-
-                    ln = len(chord_notes)
-                    if ln == 0:
-                        continue
-
-                    for name, cfg in pattern_cfgs.items():
-                        # Skip disabled patterns (send note_off if needed)
-                        if not cfg.get("enabled", True):
-                            rt = pattern_state[name]
-                            if rt["note_on"] is not None:
-                                port, ch = outputs[name]
-                                port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
-                                rt["note_on"] = None
-                                rt["gate_left"] = 0.0
-                            continue
-                        rt = pattern_state[name]
-                        rt["tick"] += 1.0
-                        if rt["tick"] + 1e-9 < cfg["pulses"]:
-                            continue  # wait until pulses reached
-
-                        rt["tick"] -= cfg["pulses"]
-
-                        plen = cfg["length"]
-                        steps = cfg["steps"]
-                        velocities = cfg["velocity"]
-                        vrands = cfg["vrandom"]
-                        gates = cfg["gate"]
-                        sprobs = cfg.get("sprob", [100]*len(steps))
-                        socts = cfg.get("soct", [0]*len(steps))
-                        rocts = cfg.get("roct", ["0"]*len(steps))
-
-                        step_pos = rt["step"] % plen
-                        # Reset random cache at start of cycle
-                        if step_pos == 0:
-                            rt["rand"] = [None] * len(steps)
-                            rt["rand_vel"] = [None] * len(velocities)
-
-                        # Probability check
-                        if random.randint(1,100) > sprobs[step_pos % len(sprobs)]:
-                            # probability skip – send off if sustaining
-                            if rt["note_on"] is not None and rt["gate_left"] == -1.0:
-                                port, ch = outputs[name]
-                                if DEBUG_ARP:
-                                    print(f"{name} NOTE_OFF {rt['note_on']} ch={ch+1}")
-                                port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
-                                rt["note_on"] = None
-                                rt["gate_left"] = 0.0
-                                rt["tie_prev"] = False
-                            rt["step"] = (rt["step"] + 1) % plen
-                            continue
-
-                        step_val = steps[step_pos]
-
-                        # note index resolution
-                        if isinstance(step_val, str):
-                            if step_val.upper() == "X":
-                                # rest – send pending off if sustaining, advance step
-                                if rt["note_on"] is not None and rt["gate_left"] == -1.0:
-                                    port, ch = outputs[name]
-                                    if DEBUG_ARP:
-                                        print(f"{name} NOTE_OFF {rt['note_on']} ch={ch+1}")
-                                    port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
-                                    rt["note_on"] = None
-                                    rt["gate_left"] = 0.0
-                                    rt["tie_prev"] = False
-                                rt["step"] = (rt["step"] + 1) % plen
-                                continue
-                            if step_val.upper() == "R":
-                                if len(rt["rand"]) < len(steps):
-                                    rt["rand"] += [None]*(len(steps)-len(rt["rand"]))
-                                if rt["rand"][step_pos] is None:  # type: ignore[index]
-                                    rt["rand"][step_pos] = random.randint(1, ln)  # type: ignore[index,assignment]
-                            idx = rt["rand"][step_pos]
-                        else:
-                            idx = int(step_val)
-
-                        if idx is None or not (1 <= idx <= ln):
-                            idx = random.randint(1, ln)
-                        extra_shift = pick_roct(rocts[step_pos % len(rocts)])
-                        note_num = chord_notes[idx - 1] + (cfg["octave"] + socts[step_pos % len(socts)] + extra_shift) * 12
-                        # choose velocity for this step
-                        vel_val = velocities[step_pos % len(velocities)] if velocities else 100
-                        vrand_val = vrands[step_pos % len(vrands)] if vrands else 0
-                        # handle random velocity
-                        if isinstance(vel_val, str) and vel_val.upper() == "R":
-                            if len(rt["rand_vel"]) < len(velocities):
-                                rt["rand_vel"] += [None]*(len(velocities)-len(rt["rand_vel"]))
-                            if rt["rand_vel"][step_pos] is None:  # type: ignore[index,assignment]
-                                rt["rand_vel"][step_pos] = random.randint(1, 127)  # type: ignore[index,assignment]
-                            base_vel = rt["rand_vel"][step_pos]
-                        else:
-                            base_vel = int(vel_val)
-
-                        if base_vel is None:
-                            base_vel = 64
-
-                        # apply vrandom percentage to get final vel
-                        if vrand_val >= 100:
-                            vel = random.randint(1, 127)
-                        elif vrand_val > 0:
-                            span = int(vrand_val * 127 / 100)
-                            half = span // 2
-                            vel = random.randint(max(1, base_vel - half), min(127, base_vel + half))
-                        else:
-                            vel = base_vel
-
-                        # gate handling
-                        gate_val = gates[step_pos % len(gates)] if gates else 100
-                        tie_flag = isinstance(gate_val, str) and str(gate_val).upper() == "T"
-
-                        # note already includes global + step octave shift
-                        if not (0 <= note_num <= 127):
-                            continue  # skip if out of MIDI range
-                        port, ch = outputs[name]
-                        # note-on/note-off logic with tie
-                        if tie_flag:
-                            # Tie step: sustain or overlap
-                            if rt["note_on"] is None:
-                                # Nothing playing, just start note
-                                port.send(mido.Message("note_on", note=note_num, velocity=vel, channel=ch))
-                                rt["note_on"] = note_num
-                                last_played[name] = note_num
-                            else:
-                                if rt["note_on"] != note_num:
-                                    # Different note – overlap for glide
-                                    # overlap 1 tick: schedule previous note off after next tick
-                                    rt["pending_off"] = rt["note_on"]
-                                    rt["pending_left"] = 1.0
-                                    port.send(mido.Message("note_on", note=note_num, velocity=vel, channel=ch))
-                                    rt["note_on"] = note_num
-                                    last_played[name] = note_num
-                                # same note: keep sustaining (no retrigger)
-                            rt["gate_left"] = -1.0  # sustain until next non-tie gate
-                            rt["tie_prev"] = True
-                        else:
-                            # --- Always retrigger note (avoid hanging) ---
-                            if rt["note_on"] is not None:
-                                # if coming from tie and glide logic needed with different note, keep existing behaviour
-                                if rt["tie_prev"] and rt["note_on"] != note_num:
-                                    rt["pending_off"] = rt["note_on"]
-                                    rt["pending_left"] = 1.0
-                                else:
-                                    port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
-
-                            port.send(mido.Message("note_on", note=note_num, velocity=vel, channel=ch))
-                            rt["note_on"] = note_num
-                            last_played[name] = note_num
-                            rt["tie_prev"] = False
-
-                            gate_percent = int(gate_val) if not isinstance(gate_val, str) else 100
-                            rt["gate_left"] = cfg["pulses"] * gate_percent / 100.0
-
-                        # advance step
-                        rt["step"] = (rt["step"] + 1) % plen
-
-                    # -------- handle gate countdown & note_off ----------
-                    for pname, rt in pattern_state.items():
-                        if rt["note_on"] is not None and rt["gate_left"] > 0:
-                            rt["gate_left"] -= 1.0
-                            if rt["gate_left"] <= 0:
-                                port, ch = outputs[pname]
-                                if DEBUG_ARP:
-                                    print(f"{pname} NOTE_OFF {rt['note_on']} ch={ch+1}")
-                                port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
-                                rt["note_on"] = None
-                                rt["gate_left"] = 0.0
-                        # if gate_left == -1 (tie) keep sustaining
-                        # pending off overlap handling
-                        if rt["pending_off"] is not None:
-                            rt["pending_left"] -= 1.0
-                            if rt["pending_left"] <= 0:
-                                port, ch = outputs[pname]
-                                port.send(mido.Message("note_off", note=rt["pending_off"], velocity=0, channel=ch))
-                                rt["pending_off"] = None
-
-                    continue  # handled clock
-
-                if msg.type == "start":
-                    print("[Transport] START received – immediate first step")
-                    for rt in pattern_state.values():
-                        rt["tick"] = 0.0
-                        rt["step"] = 0
-                        rt["rand"] = []
-                        rt["rand_vel"] = []
-
-                    # Send first step immediately if chord held
-                    if chord_notes:
-                        for pname in pattern_cfgs.keys():
-                            play_pattern_step(pname)
-                    continue
+                        out.close()
+                    except Exception:
+                        pass
+                outputs = create_output_ports(new_out_map)  # type: ignore[assignment]
+                out_map.clear()
+                out_map.update(new_out_map)
+
+            pattern_cfgs = new_cfgs  # type: ignore[assignment]
+
+            # Recreate/refresh pattern_state dict
+            pattern_state.clear()
+            for name in pattern_cfgs:
+                pattern_state[name] = PatternRT()
+            pattern_table = build_table()
+            last_played = array("h", [-1]) * len(pattern_table)
+            timed_mask = 0
+            quiet = lag = 0
+
+            log.info("Configuration reloaded from config.json (ports and patterns updated)")
+        except Exception as err:
+            log.error("Failed to reload configuration: %s", err)
+
+    def apply_enable_mask() -> None:
+        """Update only the per-pattern enabled flags."""
+        settle()
+        try:
+            for pname, flag in load_enable_mask().items():
+                if pname in pattern_cfgs:
+                    pattern_cfgs[pname].enabled = flag
+        except Exception as err:
+            log.error("Failed to reload enabled patterns: %s", err)
+
+    def settle() -> None:
+        """Add the pulses the idle fast path deferred to every enabled
+        pattern's tick, and make the next pulse walk all patterns again.
+
+        Called before anything that reads or resets ticks, or changes which
+        patterns are enabled."""
+        nonlocal lag, quiet
+        if lag:
+            for _name, cfg, rt, _out in pattern_table:
+                if cfg.enabled:
+                    rt.tick += lag * SUBPULSES
+            lag = 0
+        quiet = 0
+
+    def clock_pulse() -> None:
+        """Advance every pattern by one MIDI clock pulse."""
+        nonlocal timed_mask, quiet, lag
+        if not chord_notes:
+            # Nothing to silence: the chord → empty edge in handle_note
+            # already sent the Note Offs
+            if DEBUG_ARP:
+                assert all(rt.note_on is None for _n, _c, rt, _o in pattern_table)
+            return
 
-                if msg.type == "stop":
-                    # Stop only resets counters and shuts off notes; arp will re-arm automatically when notes are held.
-                    for pname, rt in pattern_state.items():
-                        if rt["note_on"] is not None:
-                            port, ch = outputs[pname]
-                            if DEBUG_ARP:
-                                print(f"{pname} NOTE_OFF {rt['note_on']} ch={ch+1}")
-                            port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
-                            rt["note_on"] = None
-                            rt["gate_left"] = 0.0
-                        last_played[pname] = None
-                    tick_counter = 0
-                    step_index = 0
-                    print("[Transport] STOP message received – counters cleared")
+        ln = len(chord_notes)
+        # random() is one C call; randint()/choice() go through several
+        # Python-level frames, so draws are scaled from it directly
+        rand01 = random.random
+        # Messages of this pulse, sent together at the end in the order
+        # they were produced (a short gate may end a note it just started)
+        outbox: List[Tuple[Any, Any]] = []
+        post = outbox.append
+
+        if quiet:
+            # No enabled pattern can reach its next step on this pulse:
+            # count it in ``lag`` instead of walking the patterns
+            quiet -= 1
+            lag += 1
+        else:
+            step_ticks = (1 + lag) * SUBPULSES
+            lag = 0
+            next_quiet = -1
+            for pid, (name, cfg, rt, out) in enumerate(pattern_table):
+                # Skip disabled patterns (send note_off if needed)
+                if not cfg.enabled:
+                    if rt.note_on is not None:
+                        post((out.send, out.offs[rt.note_on]))
+                        rt.note_on = None
+                        rt.gate_left = 0.0
                     continue
-
-                # ----------------------------- Note handling ----------------
-                if msg.type in ("note_on", "note_off") and msg.channel == in_channel:
-                    prev_len = len(chord_notes)
-                    note = msg.note
-                    if msg.type == "note_on" and msg.velocity > 0:
-                        add_note(chord_notes, note)
-                    else:  # note_off OR note_on with velocity 0
-                        remove_note(chord_notes, note)
-
-                    new_len = len(chord_notes)
-
-                    # When chord becomes empty → stop all currently sounding notes
-                    if new_len == 0 and prev_len > 0:
-                        # Send note_off for any active notes tracked in pattern_state
-                        for pname, rt in pattern_state.items():
-                            if rt["note_on"] is not None:
-                                port, ch = outputs[pname]
-                                if DEBUG_ARP:
-                                    print(f"{pname} NOTE_OFF {rt['note_on']} ch={ch+1}")
-                                port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
-                                rt["note_on"] = None
-                                rt["gate_left"] = 0.0
-                            last_played[pname] = None
-                        for rt in pattern_state.values():
-                            rt["tick"] = 0.0
-                            rt["step"] = 0
-                            rt["rand"] = []
-                            rt["rand_vel"] = []
-                        continue
-
-                    # When chord starts (was empty) → reset sequence to start on index 0
-                    if prev_len == 0 and new_len > 0:
-                        for rt in pattern_state.values():
-                            rt["tick"] = 0.0
-                            rt["step"] = 0
-                            rt["rand"] = []
-                            rt["rand_vel"] = []
-                        # play first step instantly
-                        for pname in pattern_cfgs.keys():
-                            play_pattern_step(pname)
-
-                    # If chord size changed but not empty, keep current step_index so arpeggio continues seamlessly.
+                pulses = cfg.pulses
+                tick = rt.tick + step_ticks
+                if tick < pulses:
+                    rt.tick = tick
+                    # pulses left before this pattern's next step is due
+                    due = (pulses - tick - 1) // SUBPULSES
+                    if next_quiet < 0 or due < next_quiet:
+                        next_quiet = due
+                    continue  # wait until pulses reached
+
+                rt.tick = tick = tick - pulses
+                due = (pulses - tick - 1) // SUBPULSES
+                if next_quiet < 0 or due < next_quiet:
+                    next_quiet = due
+
+                plen = cfg.length
+
+                # Step counters wrap with a compare instead of a modulo
+                step_pos = rt.step
+                next_step = 0 if step_pos + 1 == plen else step_pos + 1
+                # Every per-step column for this step, gathered by one index
+                step_val, vel_low, vel_width, spread, sprob, semis, roct, gate_len = cfg.rows[step_pos]
+                bit = 1 << step_pos
+                # Reset random cache at start of cycle
+                if step_pos == 0:
+                    rt.rand[:] = _NO_DRAWS
+                    rt.rand_vel[:] = _NO_DRAWS
+
+                # Probability check
+                if sprob < 100 and rand01() * 100 >= sprob:
+                    # probability skip – send off if sustaining
+                    if rt.note_on is not None and rt.gate_left == -1.0:
+                        if DEBUG_ARP:
+                            log.debug("%s NOTE_OFF %d ch=%d", name, rt.note_on, out.channel + 1)
+                        post((out.send, out.offs[rt.note_on]))
+                        rt.note_on = None
+                        rt.gate_left = 0.0
+                        rt.tie_prev = False
+                    rt.step = next_step
                     continue
 
-                # We ignore all other message types.
+                if cfg.rest_mask & bit:
+                    # rest – send pending off if sustaining, advance step
+                    if rt.note_on is not None and rt.gate_left == -1.0:
+                        if DEBUG_ARP:
+                            log.debug("%s NOTE_OFF %d ch=%d", name, rt.note_on, out.channel + 1)
+                        post((out.send, out.offs[rt.note_on]))
+                        rt.note_on = None
+                        rt.gate_left = 0.0
+                        rt.tie_prev = False
+                    rt.step = next_step
+                    continue
 
-        except KeyboardInterrupt:
-            print("Stopping router…")
-        finally:
-            cleanup_lock()
-            # make sure we send note_off on exit
-            for pname, rt in pattern_state.items():
-                if rt["note_on"] is not None:
-                    port, ch = outputs[pname]
+                # note index resolution
+                if cfg.rand_mask & bit:
+                    rand = rt.rand
+                    idx = rand[step_pos]
+                    if idx < 0:
+                        idx = rand[step_pos] = 1 + int(rand01() * ln)
+                else:
+                    idx = step_val
+
+                if not (1 <= idx <= ln):
+                    idx = 1 + int(rand01() * ln)
+                extra_shift = roct[int(rand01() * len(roct))] if roct is not None else 0
+                note_num = chord_notes[idx - 1] + semis + extra_shift * 12
+                # handle random velocity
+                if cfg.vel_rand_mask & bit:
+                    rand_vel = rt.rand_vel
+                    base_vel = rand_vel[step_pos]
+                    if base_vel < 0:
+                        base_vel = rand_vel[step_pos] = 1 + int(rand01() * 127)
+                    vel_low, vel_width = _vel_window(base_vel, spread)
+
+                # apply vrandom percentage to get final vel
+                vel = vel_low + int(rand01() * vel_width) if vel_width else vel_low
+
+                # note already includes global + step octave shift
+                if not (0 <= note_num <= 127):
+                    continue  # skip if out of MIDI range
+                # note-on/note-off logic with tie
+                if cfg.tie_mask & bit:
+                    # Tie step: sustain or overlap
+                    if rt.note_on is None:
+                        # Nothing playing, just start note
+                        post((out.send, (out.on_status, note_num, vel)))
+                        rt.note_on = note_num
+                        last_played[pid] = note_num
+                    else:
+                        if rt.note_on != note_num:
+                            # Different note – overlap for glide
+                            # overlap 1 tick: schedule previous note off after next tick
+                            rt.pending_off = rt.note_on
+                            rt.pending_left = 1.0
+                            timed_mask |= 1 << pid
+                            post((out.send, (out.on_status, note_num, vel)))
+                            rt.note_on = note_num
+                            last_played[pid] = note_num
+                        # same note: keep sustaining (no retrigger)
+                    rt.gate_left = -1.0  # sustain until next non-tie gate
+                    rt.tie_prev = True
+                else:
+                    # --- Always retrigger note (avoid hanging) ---
+                    if rt.note_on is not None:
+                        # if coming from tie and glide logic needed with different note, keep existing behaviour
+                        if rt.tie_prev and rt.note_on != note_num:
+                            rt.pending_off = rt.note_on
+                            rt.pending_left = 1.0
+                            post((out.send, (out.on_status, note_num, vel)))
+                        else:
+                            post((out.send, out.offs[rt.note_on]))
+                            post((out.send, (out.on_status, note_num, vel)))
+                    else:
+                        post((out.send, (out.on_status, note_num, vel)))
+                    rt.note_on = note_num
+                    last_played[pid] = note_num
+                    rt.tie_prev = False
+
+                    rt.gate_left = gate_len
+                    # also covers a tie overlap started just above
+                    timed_mask |= 1 << pid
+
+                # advance step
+                rt.step = next_step
+
+            quiet = max(0, next_quiet)
+
+        # -------- handle gate countdown & note_off ----------
+        # Only patterns flagged in timed_mask have a gate or overlap running
+        todo = timed_mask
+        while todo:
+            low = todo & -todo
+            todo ^= low
+            pname, _cfg, rt, out = pattern_table[low.bit_length() - 1]
+            if rt.note_on is not None and rt.gate_left > 0:
+                rt.gate_left -= 1.0
+                if rt.gate_left <= 0:
                     if DEBUG_ARP:
-                        print(f"{pname} NOTE_OFF {rt['note_on']} ch={ch+1}")
-                    port.send(mido.Message("note_off", note=rt["note_on"], velocity=0, channel=ch))
-                    rt["note_on"] = None
-            for port, _ in outputs.values():
-                port.close()
+                        log.debug("%s NOTE_OFF %d ch=%d", pname, rt.note_on, out.channel + 1)
+                    post((out.send, out.offs[rt.note_on]))
+                    rt.note_on = None
+                    rt.gate_left = 0.0
+            # if gate_left == -1 (tie) keep sustaining
+            # pending off overlap handling
+            if rt.pending_off is not None:
+                rt.pending_left -= 1.0
+                if rt.pending_left <= 0:
+                    post((out.send, out.offs[rt.pending_off]))
+                    rt.pending_off = None
+            if rt.pending_off is None and (rt.note_on is None or rt.gate_left <= 0):
+                timed_mask ^= low
+
+        for send, msg in outbox:
+            send(msg)
+
+    def skip_pulses(count: int) -> None:
+        """Advance every pattern by *count* pulses without sounding any step."""
+        if not chord_notes:
+            return
+        settle()
+        for _name, cfg, rt, out in pattern_table:
+            # Notes already sounding still end on time
+            if rt.note_on is not None and rt.gate_left > 0:
+                rt.gate_left -= count
+                if rt.gate_left <= 0:
+                    out.note_off(rt.note_on)
+                    rt.note_on = None
+                    rt.gate_left = 0.0
+            if rt.pending_off is not None:
+                rt.pending_left -= count
+                if rt.pending_left <= 0:
+                    out.note_off(rt.pending_off)
+                    rt.pending_off = None
+            if not cfg.enabled:
+                continue
+            pulses = cfg.pulses
+            tick = rt.tick + count * SUBPULSES
+            due = tick // pulses
+            rt.tick = tick - due * pulses
+            if due:
+                step = rt.step + due
+                if step >= cfg.length:
+                    # Skipped past step 0: draw fresh random values
+                    rt.rand[:] = _NO_DRAWS
+                    rt.rand_vel[:] = _NO_DRAWS
+                rt.step = step % cfg.length
+
+    def handle_clocks(burst: List[List[int]]) -> None:
+        """Process the clock pulses in *burst*, queued back-to-back."""
+        count = len(burst)
+        if clock is not None:
+            # Stamped on arrival by the rtmidi callback, so queueing delay
+            # in this thread does not count as a gap
+            for message in burst:
+                count += clock.pulses(message[1]) - 1
+        if CLOCK_CATCHUP and count > CLOCK_CATCHUP:
+            skip_pulses(count - CLOCK_CATCHUP)
+            count = CLOCK_CATCHUP
+        for _ in range(count):
+            clock_pulse()
+
+    def silence_all() -> None:
+        """Note Off for every sounding or overlapping note of every pattern."""
+        for pid, (pname, _cfg, rt, out) in enumerate(pattern_table):
+            if rt.note_on is not None:
+                if DEBUG_ARP:
+                    log.debug("%s NOTE_OFF %d ch=%d", pname, rt.note_on, out.channel + 1)
+                out.note_off(rt.note_on)
+                rt.note_on = None
+                rt.gate_left = 0.0
+            if rt.pending_off is not None:
+                out.note_off(rt.pending_off)
+                rt.pending_off = None
+            last_played[pid] = -1
+
+    # ----------------------------- Transport handling ----------------
+    def handle_start(message: List[int]) -> None:
+        """Start: rewind every pattern and play its first step now."""
+        log.info("[Transport] START received – immediate first step")
+        settle()
+        if clock is not None:
+            clock.reset()
+        for rt in pattern_state.values():
+            rt.rewind()
+
+        # Send first step immediately if chord held
+        if chord_notes:
+            for pid in range(len(pattern_table)):
+                play_pattern_step(pid)
+
+    def handle_stop(message: List[int]) -> None:
+        """Stop: silence every pattern."""
+        # Stop only resets counters and shuts off notes; arp will re-arm automatically when notes are held.
+        silence_all()
+        if clock is not None:
+            clock.reset()
+        log.info("[Transport] STOP message received – counters cleared")
+
+    # ----------------------------- Note handling ----------------------
+    def handle_note(message: List[int]) -> None:
+        """Note On/Off on the input channel: update the held chord."""
+        settle()
+        prev_len = len(chord_notes)
+        note = message[1]
+        if message[0] & 0xF0 == 0x90 and message[2] > 0:
+            chord.add(note)
+        else:  # note_off OR note_on with velocity 0
+            chord.remove(note)
+
+        new_len = len(chord_notes)
+
+        # When chord becomes empty → stop all currently sounding notes
+        if new_len == 0 and prev_len > 0:
+            silence_all()
+            for rt in pattern_state.values():
+                rt.rewind()
+            return
+
+        # When chord starts (was empty) → reset sequence to start on index 0
+        if prev_len == 0 and new_len > 0:
+            for rt in pattern_state.values():
+                rt.rewind()
+            # play first step instantly
+            for pid in range(len(pattern_table)):
+                play_pattern_step(pid)
+
+        # If chord size changed but not empty, keep current step_index so arpeggio continues seamlessly.
+
+    # Status byte → handler, indexed directly by the byte; None entries
+    # (other message types, notes on other channels) are ignored. Clock
+    # (0xF8) is checked first by the main loop, which batches pulses.
+    handlers: List[Any] = [None] * 256
+    handlers[0xFA] = handle_start
+    handlers[0xFC] = handle_stop
+    handlers[0x90 | in_channel] = handle_note
+    handlers[0x80 | in_channel] = handle_note
+    dispatch = tuple(handlers)
+
+    input_name = "TR Router In"
+    log.info(
+        "Creating virtual input '%s' listening on MIDI channel %d\n"
+        "• Send START/STOP and CLOCK from your DAW to this port to drive the arpeggiator.\n"
+        "• Play chords (≤8 notes) on the same channel to generate arpeggios.",
+        input_name,
+        in_channel + 1,
+    )
+
+    midi_in = rtmidi.MidiIn()
+    midi_in.ignore_types(sysex=True, timing=False, active_sense=True)  # keep clock
+    midi_in.set_callback(_on_midi_input if clock is None else _on_midi_input_timed, events)
+    midi_in.open_virtual_port(input_name)
+    threading.Thread(target=_watch_config, args=(loaded_stamp, events), daemon=True).start()
+    quiet_gc()
+    # Raised last so the watcher and rtmidi threads keep normal priority
+    if raise_thread_priority():
+        log.info("Router thread running with SCHED_FIFO priority")
+    if PIN_CPU is not None:
+        if pin_thread_cpu(PIN_CPU):
+            log.info("Router thread pinned to CPU %d", PIN_CPU)
+        else:
+            log.warning("Warning: could not pin router thread to CPU %d", PIN_CPU)
+    get_event = events.get
+    get_waiting = events.get_nowait
+    Empty = queue.Empty
+    idle = events.empty
+    pending: Any = None  # item read ahead while coalescing clock pulses
+    reload_due = False   # a reload was requested but not yet run
+    try:
+        while True:
+            if pending is None:
+                item = get_event()
+            else:
+                item, pending = pending, None
+            if item is _RELOAD:
+                # Deferred until the queue drains (below), so a burst of
+                # requests costs one reload and never holds up waiting MIDI
+                reload_due = True
+            elif item is _ENABLE_MASK:
+                # Applied after any queued full reload: the mask is newer
+                if reload_due:
+                    reload_due = False
+                    reload_config()
+                apply_enable_mask()
+            elif item[0] == 0xF8:
+                # Coalesce the clock pulses already waiting behind this one
+                burst = [item]
+                while True:
+                    try:
+                        pending = get_waiting()
+                    except Empty:
+                        break
+                    if pending is _RELOAD or pending is _ENABLE_MASK or pending[0] != 0xF8:
+                        break
+                    burst.append(pending)
+                    pending = None
+                handle_clocks(burst)
+            else:
+                handler = dispatch[item[0]]
+                if handler is not None:
+                    handler(item)
+            if reload_due and pending is None and idle():
+                reload_due = False
+                reload_config()
+    except KeyboardInterrupt:
+        log.info("Stopping router…")
+    finally:
+        midi_in.cancel_callback()
+        midi_in.close_port()
+        cleanup_lock()
+        # make sure we send note_off on exit
+        silence_all()
+        for out in outputs.values():
+            out.close()
+
+
+def main():
+    listener = start_logging()
+    try:
+        run_router()
+    finally:
+        listener.stop()
 
 
 # ---------------------------------------------------------------------------
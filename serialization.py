@@ -0,0 +1,63 @@
+"""JSON helpers shared by the config editor and the MIDI router.
+
+Uses ``orjson`` when it is installed and falls back to the standard
+library otherwise. Both sides work on UTF-8 bytes, so files are read and
+written without an extra str round-trip.
+"""
+
+import json
+import re
+from typing import Any
+
+try:  # optional – faster JSON parsing/encoding when available
+    import orjson
+except ImportError:
+    orjson = None
+
+# String literals are matched (and kept) first, so "//" inside a value survives.
+_COMMENT_RE = re.compile(rb'("(?:\\.|[^"\\])*")|//[^\n]*')
+
+
+def _keep_string(m: "re.Match[bytes]") -> bytes:
+    return m.group(1) or b""
+
+
+def strip_comments(raw: bytes) -> bytes:
+    """Remove ``//`` comments from JSON bytes, leaving string contents intact."""
+    return _COMMENT_RE.sub(_keep_string, raw)
+
+
+def loads(raw: bytes) -> Any:
+    """Parse UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def loads_jsonc(raw: bytes) -> Any:
+    """Parse JSON bytes that may contain ``//`` comments.
+
+    Files the editor writes are strict JSON, so the regex pass only runs
+    when the bytes contain a ``//`` at all.
+    """
+    if b"//" in raw:
+        raw = strip_comments(raw)
+    return loads(raw)
+
+
+_PRETTY = orjson.OPT_INDENT_2 if orjson is not None else 0
+_COMPACT = 0
+_COMPACT_SEPARATORS = (",", ":")
+
+
+def dumps(data: Any, pretty: bool = True) -> bytes:
+    """Serialize to UTF-8 JSON bytes, indented by 2 spaces when *pretty*.
+
+    Compact output is for private machine-read files such as the enable mask;
+    config.json stays indented because it is tracked and hand-edited.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=_PRETTY if pretty else _COMPACT)
+    if pretty:
+        return json.dumps(data, indent=2).encode("utf-8")
+    return json.dumps(data, separators=_COMPACT_SEPARATORS).encode("utf-8")